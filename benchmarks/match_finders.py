@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark the LZ77 match finders against each other on inputs of increasing size.
+
+For every input size the script times LZ77Compressor.encode with each match finder
+and reports throughput and token counts, followed by the fastest finder per size so
+the crossover points between the window scanners and the whole-buffer suffix array
+can be read off directly. The "kmp" finder is the baseline 512-byte window scanner,
+which is too slow for large inputs: by default it only runs up to KMP_MAX_SIZE.
+
+Examples:
+    python benchmarks/match_finders.py
+    python benchmarks/match_finders.py --input big.log --sizes 1M,10M,100M \
+        --finders hash_chain,suffix_array
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from compressors.lz77 import LZ77Compressor
+
+SIZE_SUFFIXES = {"K": 2**10, "M": 2**20, "G": 2**30}
+# Window size per finder, the other finders use the full DEFLATE window
+FINDER_WINDOW_SIZES = {"kmp": 2**9}
+# Largest input the baseline scanner runs on unless it is requested explicitly
+KMP_MAX_SIZE = 2**16
+
+
+def parse_size(text: str) -> int:
+    """Parse a size such as ``64K`` or ``10M`` into a number of bytes."""
+    text = text.strip().upper()
+    if text and text[-1] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def synthetic_data(size: int, seed: int = 0) -> bytes:
+    """Generate log-like text with repeats at varying distances."""
+    rng = random.Random(seed)
+    words = [
+        bytes(
+            rng.choice(b"abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9))
+        )
+        for _ in range(2000)
+    ]
+    lines = []
+    total = 0
+    while total < size:
+        line = b" ".join(rng.choice(words) for _ in range(rng.randint(4, 16))) + b"\n"
+        lines.append(line)
+        total += len(line)
+    return b"".join(lines)[:size]
+
+
+def run_benchmark(
+    data: bytes, sizes: list[int], finders: list[str], max_sizes=None
+) -> None:
+    """
+    Time every finder on every prefix size and print a results table.
+
+    :param max_sizes: Largest size to run each finder on, by finder name. Finders
+        not in it run on every size.
+    """
+    max_sizes = max_sizes or {}
+    print(f"{'size':>10} {'finder':>14} {'seconds':>10} {'MB/s':>8} {'tokens':>10}")
+    fastest = {}
+    for size in sizes:
+        chunk = data[:size]
+        for finder in finders:
+            if size > max_sizes.get(finder, size):
+                continue
+            start_time = time.perf_counter()
+            tokens = LZ77Compressor.encode(
+                chunk,
+                match_finder=finder,
+                window_size=FINDER_WINDOW_SIZES.get(finder, 2**15),
+            )
+            elapsed = time.perf_counter() - start_time
+
+            throughput = len(chunk) / elapsed / 2**20 if elapsed > 0 else float("inf")
+            print(
+                f"{len(chunk):>10,} {finder:>14} {elapsed:>10.2f} "
+                f"{throughput:>8.3f} {len(tokens):>10,}"
+            )
+            if size not in fastest or elapsed < fastest[size][1]:
+                fastest[size] = (finder, elapsed)
+
+    print()
+    print("Fastest finder per size:")
+    for size, (finder, elapsed) in fastest.items():
+        print(f"{size:>10,} {finder:>14} {elapsed:>10.2f}")
+
+
+def main():
+    """Main entry point for the benchmark."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--input",
+        type=Path,
+        help="Benchmark prefixes of this file (default: synthetic log-like data)",
+    )
+    parser.add_argument(
+        "--sizes",
+        default="16K,64K,256K",
+        help="Comma separated input sizes, e.g. 1M,10M,100M (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--finders",
+        help="Comma separated match finders to compare (default: all, with kmp only "
+        f"up to {KMP_MAX_SIZE // 2**10}K)",
+    )
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    if args.finders is None:
+        finders = list(LZ77Compressor.MATCH_FINDERS)
+        max_sizes = {"kmp": KMP_MAX_SIZE}
+    else:
+        finders = [finder.strip() for finder in args.finders.split(",")]
+        max_sizes = {}
+    if args.input is not None:
+        data = args.input.read_bytes()
+    else:
+        data = synthetic_data(max(sizes))
+
+    run_benchmark(data, sizes, finders, max_sizes)
+
+
+if __name__ == "__main__":
+    main()
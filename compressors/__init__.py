@@ -1,3 +1,4 @@
+from .compressor import Compressor, Decompressor
 from .deflate import DeflateCompressor
 
-__all__ = ["DeflateCompressor"]
+__all__ = ["Compressor", "Decompressor", "DeflateCompressor"]
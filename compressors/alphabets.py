@@ -0,0 +1,196 @@
+class SymbolLengthAlphabet:
+    LENGTH_TABLE = (
+        (3, 0),
+        (4, 0),
+        (5, 0),
+        (6, 0),
+        (7, 0),
+        (8, 0),
+        (9, 0),
+        (10, 0),
+        # Codes 257-264
+        (11, 1),
+        (13, 1),
+        (15, 1),
+        (17, 1),  # Codes 265-268
+        (19, 2),
+        (23, 2),
+        (27, 2),
+        (31, 2),  # Codes 269-272
+        (35, 3),
+        (43, 3),
+        (51, 3),
+        (59, 3),  # Codes 273-276
+        (67, 4),
+        (83, 4),
+        (99, 4),
+        (115, 4),  # Codes 277-280
+        (131, 5),
+        (163, 5),
+        (195, 5),
+        (227, 5),  # Codes 281-284
+        (258, 0),  # Code 285
+    )
+
+    @classmethod
+    def decode(cls, symbol, extra_bits):
+        """
+        Decodes a symbol and extra bits into its literal/length representation.
+        """
+        if 0 <= symbol <= 255:
+            # Literal symbol
+            return symbol
+        elif 257 <= symbol <= 285:
+            # Decode length
+            return cls.decode_length(symbol, extra_bits)
+        else:
+            raise ValueError("Invalid symbol for literal/length alphabet.")
+
+    @classmethod
+    def encode(cls, length):
+        """
+        Encodes the given length into a symbol and extra bits based on the deflate
+        length table.
+        Returns the symbol and a list of extra bits.
+        """
+        symbol, extra_value, extra_bits = cls.encode_length(length)
+        if extra_bits > 0:
+            extra_bits_encoded = f"{extra_value:0{extra_bits}b}"
+        else:
+            extra_bits_encoded = ""
+        return symbol, extra_bits_encoded.encode()
+
+    @classmethod
+    def encode_length(cls, length):
+        """
+        Encodes the given length into a symbol and its extra bits as integers.
+        Returns the symbol, the extra value and the number of extra bits.
+        """
+        # Code 284 could also express 258, but RFC 1951 reserves code 285 for it
+        if length == 258:
+            return 285, 0, 0
+
+        for i, (base, extra_bits) in enumerate(cls.LENGTH_TABLE):
+            if base <= length < base + (1 << extra_bits):
+                return 257 + i, length - base, extra_bits
+
+        raise ValueError("Invalid length value.")
+
+    @classmethod
+    def decode_length(cls, symbol, data):
+        """
+        Decodes a symbol and extra bits into the original length value.
+        Consumes the required number of bits from the input data.
+        """
+
+        if not (257 <= symbol < 286):
+            raise ValueError("Invalid length symbol.")
+
+        base, extra_bits = cls.LENGTH_TABLE[symbol - 257]
+
+        # Read the required number of extra bits
+        extra_value = 0
+        if extra_bits > 0:
+            extra_bits_str = data[:extra_bits]
+            extra_value = int(extra_bits_str, 2)
+
+        # Calculate the decoded length
+        return base + extra_value, data[extra_bits:]
+
+
+class DistanceAlphabet:
+    DISTANCE_TABLE = (
+        (1, 0),
+        (2, 0),
+        (3, 0),
+        (4, 0),  # Codes 0-3
+        (5, 1),
+        (7, 1),  # Codes 4-5
+        (9, 2),
+        (13, 2),  # Codes 6-7
+        (17, 3),
+        (25, 3),  # Codes 8-9
+        (33, 4),
+        (49, 4),  # Codes 10-11
+        (65, 5),
+        (97, 5),  # Codes 12-13
+        (129, 6),
+        (193, 6),  # Codes 14-15
+        (257, 7),
+        (385, 7),  # Codes 16-17
+        (513, 8),
+        (769, 8),  # Codes 18-19
+        (1025, 9),
+        (1537, 9),  # Codes 20-21
+        (2049, 10),
+        (3073, 10),  # Codes 22-23
+        (4097, 11),
+        (6145, 11),  # Codes 24-25
+        (8193, 12),
+        (12289, 12),  # Codes 26-27
+        (16385, 13),
+        (24577, 13),  # Codes 28-29
+    )
+    # Long range mode continues the table two codes per power of two, with codes
+    # 30-51 reaching distances of up to 2**26
+    LONG_DISTANCE_TABLE = DISTANCE_TABLE + tuple(
+        (base, bits - 1)
+        for bits in range(15, 26)
+        for base in (2**bits + 1, 3 * 2 ** (bits - 1) + 1)
+    )
+
+    @classmethod
+    def encode(cls, distance):
+        """
+        Encodes a distance into the distance alphabet format.
+        """
+        distance_symbol, extra_value, extra_bits = cls.encode_distance(distance)
+        # convert to bin with leading zeros up to extra bits
+        if extra_bits > 0:
+            extra_value = bin(extra_value)[2:].zfill(extra_bits)
+        else:
+            extra_value = ""
+        return distance_symbol, extra_value.encode()
+
+    @classmethod
+    def decode(cls, symbol, extra_bits):
+        """
+        Decodes a symbol and extra bits into its distance representation.
+        """
+        return cls.decode_distance(symbol, extra_bits)
+
+    @classmethod
+    def encode_distance(cls, distance):
+        """
+        Encodes the given distance into a symbol and extra bits based on the provided
+        table.
+        Returns the symbol and a list of extra bits.
+        """
+
+        for code, (base, extra_bits) in enumerate(cls.LONG_DISTANCE_TABLE):
+            if base <= distance < base + (1 << extra_bits):
+                # Calculate the extra bits value
+                extra_value = distance - base
+                return code, extra_value, extra_bits
+
+        raise ValueError("Invalid distance value.")
+
+    @classmethod
+    def decode_distance(cls, symbol, data):
+        """
+        Decodes a symbol and extra bits into the original distance value.
+        Consumes the required number of bits from the input data.
+        """
+
+        if not (0 <= symbol < len(cls.LONG_DISTANCE_TABLE)):
+            raise ValueError("Invalid distance symbol.")
+
+        base, extra_bits = cls.LONG_DISTANCE_TABLE[symbol]
+        # Read the required number of extra bits
+        extra_value = 0
+        if extra_bits > 0:
+            extra_bits_str = data[:extra_bits]
+            extra_value = int(extra_bits_str, 2)
+
+        # Calculate the decoded distance
+        return base + extra_value, data[extra_bits:]
@@ -0,0 +1,112 @@
+class BitWriter:
+    """
+    Bit buffer that packs integer codes into bytes, most significant bit first.
+
+    Codes are shifted into a small integer accumulator, which is flushed to a
+    bytearray a few bytes at a time, so the output takes one bit per bit instead of
+    one byte per bit like the ASCII bit strings. ``getvalue`` gives the same bytes
+    as ``binary_string_to_bytes`` of the equivalent bit string.
+    """
+
+    # Pending bits that trigger a flush of their whole bytes
+    FLUSH_BITS = 64
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._value = 0
+        self._length = 0
+
+    def write(self, value: int, length: int) -> None:
+        """Append the ``length`` low bits of ``value``, which has no higher bits."""
+        self._value = (self._value << length) | value
+        self._length += length
+        if self._length >= self.FLUSH_BITS:
+            self._flush()
+
+    def write_bit_string(self, bits: bytes) -> None:
+        """Append an ASCII bit string such as b'0110'."""
+        if bits:
+            self.write(int(bits, 2), len(bits))
+
+    def extend(self, other: "BitWriter") -> None:
+        """Append the bits of another BitWriter."""
+        self.write(int.from_bytes(other._buffer, "big"), 8 * len(other._buffer))
+        self.write(other._value, other._length)
+
+    def _flush(self) -> None:
+        """Move the whole bytes of the pending bits to the buffer."""
+        remainder = self._length & 7
+        self._buffer += (self._value >> remainder).to_bytes(self._length >> 3, "big")
+        self._value &= (1 << remainder) - 1
+        self._length = remainder
+
+    def __len__(self):
+        return 8 * len(self._buffer) + self._length
+
+    def getvalue(self) -> bytes:
+        """
+        :return: The bit length as a 4-byte prefix, followed by the bits padded with
+            zeros to a whole byte.
+        """
+        padding = -self._length & 7
+        tail = (self._value << padding).to_bytes((self._length + padding) >> 3, "big")
+        return len(self).to_bytes(4, "big") + bytes(self._buffer) + tail
+
+
+class BitReader:
+    """
+    Reads the bits of a ``BitWriter.getvalue`` result, most significant bit first.
+
+    A few bytes at a time are shifted into a small integer buffer, so peeking and
+    skipping bits costs a shift and a mask instead of slicing the remaining input.
+    Bits past the end read as zeros; ``position`` beyond ``length`` means the input
+    was too short.
+    """
+
+    # Bytes fetched per refill of the buffer
+    REFILL_BYTES = 8
+
+    def __init__(self, data: bytes):
+        """
+        :param data: The bit length as a 4-byte prefix, followed by the bits.
+        """
+        # Like the bit string decoder, ignore the bits the data is too short for
+        self.length = min(int.from_bytes(data[:4], "big"), 8 * max(len(data) - 4, 0))
+        self.position = 0
+        self._data = data
+        self._offset = 4
+        self._value = 0
+        self._bits = 0
+
+    def _refill(self, count: int) -> None:
+        """Buffer at least ``count`` bits."""
+        missing = count - self._bits
+        size = max(self.REFILL_BYTES, (missing + 7) >> 3)
+        chunk = self._data[self._offset : self._offset + size]
+        self._offset += len(chunk)
+        # Pad with zero bytes past the end of the input
+        self._value = (self._value << (8 * size)) | (
+            int.from_bytes(chunk, "big") << (8 * (size - len(chunk)))
+        )
+        self._bits += 8 * size
+
+    def peek(self, count: int) -> int:
+        """Return the next ``count`` bits without consuming them."""
+        if self._bits < count:
+            self._refill(count)
+        return (self._value >> (self._bits - count)) & ((1 << count) - 1)
+
+    def skip(self, count: int) -> None:
+        """Consume ``count`` bits, which must have been peeked."""
+        self._bits -= count
+        self._value &= (1 << self._bits) - 1
+        self.position += count
+
+    def read(self, count: int) -> int:
+        """Consume and return the next ``count`` bits."""
+        value = self.peek(count)
+        self.skip(count)
+        return value
+
+    def __len__(self):
+        return max(self.length - self.position, 0)
@@ -0,0 +1,100 @@
+from compressors.bits import BitReader, BitWriter
+from compressors.deflate import DeflateCompressor
+from compressors.helpers.block_splitter import BlockSplitter
+from compressors.lz77 import LZ77Compressor
+from compressors.tokens import TokenArray
+
+
+class Compressor:
+    """
+    Reusable DEFLATE compressor for many calls with the same settings.
+
+    ``DeflateCompressor.compress`` sets up a match finder, block splitter and token
+    buffer on every call, which dominates the cost of compressing small messages. A
+    Compressor creates them once and resets them between calls instead: the match
+    finder keeps its tables, and only the table heads are cleared. The fast strategy's
+    hash table is kept the same way and overwritten in place. The output is the
+    same as ``DeflateCompressor.compress`` with the same level and zdict.
+
+    A Compressor is not thread-safe. Keep one per thread, for example in a
+    ``threading.local``.
+    """
+
+    def __init__(
+        self, level: int = DeflateCompressor.DEFAULT_LEVEL, zdict: bytes | None = None
+    ):
+        """
+        :param level: Compression level, see ``DeflateCompressor.LEVELS``.
+        :param zdict: Preset dictionary used for every call, see
+            ``DeflateCompressor.compress``.
+        """
+        if level not in DeflateCompressor.LEVELS:
+            raise ValueError("Compression level must be between 0 and 9.")
+        self.level = level
+        self.zdict = zdict
+        self._parameters = None
+        self._finder = None
+        self._splitter = None
+        self._block = TokenArray()
+        if DeflateCompressor.LEVELS[level] is None:
+            return
+
+        parameters = dict(DeflateCompressor.LEVELS[level])
+        self._splitter = BlockSplitter(parameters.pop("block_split_observations"))
+        if parameters["strategy"] not in ("fast", "rle"):
+            self._finder = LZ77Compressor.create_match_finder(
+                parameters["match_finder"],
+                window_size=parameters["window_size"],
+                max_chain=parameters.get("max_chain"),
+                nice_length=parameters.get("nice_length"),
+            )
+            parameters["match_finder"] = self._finder
+        elif parameters["strategy"] == "fast":
+            parameters["fast_table"] = LZ77Compressor.create_fast_table()
+        self._parameters = parameters
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        Compress data like ``DeflateCompressor.compress``.
+
+        :param data: The bytes to compress.
+        :return: The compressed bytes.
+        """
+        if self._parameters is None:
+            return DeflateCompressor._write_stored_blocks(BitWriter(), data).getvalue()
+
+        tokens = LZ77Compressor.iter_encode(
+            data, token_model="deflate", dictionary=self.zdict, **self._parameters
+        )
+        self._splitter.reset()
+        self._block.clear()
+        return DeflateCompressor._encode_blocks(
+            data, tokens, self._splitter, self._block
+        ).getvalue()
+
+
+class Decompressor:
+    """
+    Reusable DEFLATE decompressor, the counterpart of Compressor.
+
+    The token buffer is kept between calls. A Decompressor is not thread-safe, keep
+    one per thread.
+    """
+
+    def __init__(self, zdict: bytes | None = None):
+        """
+        :param zdict: Preset dictionary the data was compressed with.
+        """
+        self.zdict = zdict
+        self._tokens = TokenArray()
+
+    def decompress(self, data: bytes) -> bytes:
+        """
+        Decompress data like ``DeflateCompressor.decompress``.
+
+        :param data: The compressed bytes.
+        :return: The decompressed bytes.
+        """
+        self._tokens.clear()
+        tokens = DeflateCompressor._decode_blocks(BitReader(data), self._tokens)
+        return LZ77Compressor.decode(tokens, dictionary=self.zdict)
@@ -1,202 +1,28 @@
+from typing import ClassVar
+
+from compressors.alphabets import DistanceAlphabet, SymbolLengthAlphabet
+from compressors.bits import BitReader, BitWriter
 from compressors.helpers.block_splitter import BlockSplitter
 from compressors.huffman import HuffmanCompressor
 from compressors.integer import IntegerCompressor
 from compressors.lz77 import LZ77Compressor
-
-FIXED_LENGTH_TO_CODE = {}
-for i in range(0, 144):
-    FIXED_LENGTH_TO_CODE[i] = format(i + 48, "#010b")[2:].encode()
-for i in range(0, 112):
-    FIXED_LENGTH_TO_CODE[i + 144] = format(i + 400, "#011b")[2:].encode()
-for i in range(0, 24):
-    FIXED_LENGTH_TO_CODE[256 + i] = format(i, "#09b")[2:].encode()
-for i in range(0, 8):
-    FIXED_LENGTH_TO_CODE[280 + i] = format(i + 192, "#010b")[2:].encode()
-
-FIXED_CODE_TO_LENGTH = {v: k for k, v in FIXED_LENGTH_TO_CODE.items()}
-
-FIXED_DISTANCE_TO_CODE = {i: format(i, "#07b")[2:].encode() for i in range(0, 32)}
-FIXED_CODE_TO_DISTANCE = {v: k for k, v in FIXED_DISTANCE_TO_CODE.items()}
-
-
-class SymbolLengthAlphabet:
-    LENGTH_TABLE = (
-        (3, 0),
-        (4, 0),
-        (5, 0),
-        (6, 0),
-        (7, 0),
-        (8, 0),
-        (9, 0),
-        (10, 0),
-        # Codes 257-264
-        (11, 1),
-        (13, 1),
-        (15, 1),
-        (17, 1),  # Codes 265-268
-        (19, 2),
-        (23, 2),
-        (27, 2),
-        (31, 2),  # Codes 269-272
-        (35, 3),
-        (43, 3),
-        (51, 3),
-        (59, 3),  # Codes 273-276
-        (67, 4),
-        (83, 4),
-        (99, 4),
-        (115, 4),  # Codes 277-280
-        (131, 5),
-        (163, 5),
-        (195, 5),
-        (227, 5),  # Codes 281-284
-        (258, 0),  # Code 285
-    )
-
-    @classmethod
-    def decode(cls, symbol, extra_bits):
-        """
-        Decodes a symbol and extra bits into its literal/length representation.
-        """
-        if 0 <= symbol <= 255:
-            # Literal symbol
-            return symbol
-        elif 257 <= symbol <= 285:
-            # Decode length
-            return cls.decode_length(symbol, extra_bits)
-        else:
-            raise ValueError("Invalid symbol for literal/length alphabet.")
-
-    @classmethod
-    def encode(cls, length):
-        """
-        Encodes the given length into a symbol and extra bits based on the deflate
-        length table.
-        Returns the symbol and a list of extra bits.
-        """
-
-        for i, (base, extra_bits) in enumerate(cls.LENGTH_TABLE):
-            if base <= length < base + (1 << extra_bits):
-                extra_value = length - base
-                if extra_bits > 0:
-                    extra_bits_encoded = f"{extra_value:0{extra_bits}b}"
-                else:
-                    extra_bits_encoded = ""
-                return 257 + i, extra_bits_encoded.encode()
-
-        raise ValueError("Invalid length value.")
-
-    @classmethod
-    def decode_length(cls, symbol, data):
-        """
-        Decodes a symbol and extra bits into the original length value.
-        Consumes the required number of bits from the input data.
-        """
-
-        if not (257 <= symbol < 286):
-            raise ValueError("Invalid length symbol.")
-
-        base, extra_bits = cls.LENGTH_TABLE[symbol - 257]
-
-        # Read the required number of extra bits
-        extra_value = 0
-        if extra_bits > 0:
-            extra_bits_str = data[:extra_bits]
-            extra_value = int(extra_bits_str, 2)
-
-        # Calculate the decoded length
-        return base + extra_value, data[extra_bits:]
-
-
-class DistanceAlphabet:
-    DISTANCE_TABLE = (
-        (1, 0),
-        (2, 0),
-        (3, 0),
-        (4, 0),  # Codes 0-3
-        (5, 1),
-        (7, 1),  # Codes 4-5
-        (9, 2),
-        (13, 2),  # Codes 6-7
-        (17, 3),
-        (25, 3),  # Codes 8-9
-        (33, 4),
-        (49, 4),  # Codes 10-11
-        (65, 5),
-        (97, 5),  # Codes 12-13
-        (129, 6),
-        (193, 6),  # Codes 14-15
-        (257, 7),
-        (385, 7),  # Codes 16-17
-        (513, 8),
-        (769, 8),  # Codes 18-19
-        (1025, 9),
-        (1537, 9),  # Codes 20-21
-        (2049, 10),
-        (3073, 10),  # Codes 22-23
-        (4097, 11),
-        (6145, 11),  # Codes 24-25
-        (8193, 12),
-        (12289, 12),  # Codes 26-27
-        (16385, 13),
-        (24577, 13),  # Codes 28-29
-    )
-
-    @classmethod
-    def encode(cls, distance):
-        """
-        Encodes a distance into the distance alphabet format.
-        """
-        distance_symbol, extra_value, extra_bits = cls.encode_distance(distance)
-        # convert to bin with leading zeros up to extra bits
-        if extra_bits > 0:
-            extra_value = bin(extra_value)[2:].zfill(extra_bits)
-        else:
-            extra_value = ""
-        return distance_symbol, extra_value.encode()
-
-    @classmethod
-    def decode(cls, symbol, extra_bits):
-        """
-        Decodes a symbol and extra bits into its distance representation.
-        """
-        return cls.decode_distance(symbol, extra_bits)
-
-    @classmethod
-    def encode_distance(cls, distance):
-        """
-        Encodes the given distance into a symbol and extra bits based on the provided
-        table.
-        Returns the symbol and a list of extra bits.
-        """
-
-        for code, (base, extra_bits) in enumerate(cls.DISTANCE_TABLE):
-            if base <= distance < base + (1 << extra_bits):
-                # Calculate the extra bits value
-                extra_value = distance - base
-                return code, extra_value, extra_bits
-
-        raise ValueError("Invalid distance value.")
-
-    @classmethod
-    def decode_distance(cls, symbol, data):
-        """
-        Decodes a symbol and extra bits into the original distance value.
-        Consumes the required number of bits from the input data.
-        """
-
-        if not (0 <= symbol < len(cls.DISTANCE_TABLE)):
-            raise ValueError("Invalid distance symbol.")
-
-        base, extra_bits = cls.DISTANCE_TABLE[symbol]
-        # Read the required number of extra bits
-        extra_value = 0
-        if extra_bits > 0:
-            extra_bits_str = data[:extra_bits]
-            extra_value = int(extra_bits_str, 2)
-
-        # Calculate the decoded distance
-        return base + extra_value, data[extra_bits:]
+from compressors.tokens import TokenArray
+
+# The fixed codes as canonical integer codes
+FIXED_LITERAL_LENGTH_BIT_LENGTHS = [8] * 144 + [9] * 112 + [7] * 24 + [8] * 8
+FIXED_LITERAL_LENGTH_CODES = HuffmanCompressor.generate_canonical_codes(
+    FIXED_LITERAL_LENGTH_BIT_LENGTHS
+)
+FIXED_DISTANCE_BIT_LENGTHS = [5] * 32
+FIXED_DISTANCE_CODES = HuffmanCompressor.generate_canonical_codes(
+    FIXED_DISTANCE_BIT_LENGTHS
+)
+FIXED_LITERAL_LENGTH_DECODE_TABLE = HuffmanCompressor.generate_decode_table(
+    FIXED_LITERAL_LENGTH_BIT_LENGTHS
+)
+FIXED_DISTANCE_DECODE_TABLE = HuffmanCompressor.generate_decode_table(
+    FIXED_DISTANCE_BIT_LENGTHS
+)
 
 
 def binary_string_to_bytes(binary_string: bytes) -> bytes:
@@ -235,27 +61,177 @@ def bytes_to_binary_string(data: bytes) -> bytes:
 
 
 class DeflateCompressor:
+    # Maximum number of bytes in a stored block
+    MAX_STORED_BLOCK_LENGTH = 2**16 - 1
+
+    # Parameters of each compression level, following zlib's configuration table.
+    # Level 0 only emits stored blocks. block_split_observations is the number of
+    # observations between two block splitting checks, lower means more effort.
+    LEVELS: ClassVar[dict] = {
+        0: None,
+        1: {
+            "strategy": "fast",
+            "window_size": 2**15,
+            "acceleration": 1,
+            "block_split_observations": 2048,
+        },
+        2: {
+            "match_finder": "hash_chain",
+            "strategy": "greedy",
+            "window_size": 2**15,
+            "max_chain": 8,
+            "nice_length": 16,
+            "block_split_observations": 2048,
+        },
+        3: {
+            "match_finder": "hash_chain",
+            "strategy": "greedy",
+            "window_size": 2**15,
+            "max_chain": 32,
+            "nice_length": 32,
+            "block_split_observations": 1024,
+        },
+        4: {
+            "match_finder": "hash_chain",
+            "strategy": "lazy",
+            "window_size": 2**15,
+            "max_chain": 16,
+            "nice_length": 16,
+            "max_lazy": 4,
+            "good_length": 4,
+            "block_split_observations": 1024,
+        },
+        5: {
+            "match_finder": "hash_chain",
+            "strategy": "lazy",
+            "window_size": 2**15,
+            "max_chain": 32,
+            "nice_length": 32,
+            "max_lazy": 16,
+            "good_length": 8,
+            "block_split_observations": 512,
+        },
+        6: {
+            "match_finder": "hash_chain",
+            "strategy": "lazy",
+            "window_size": 2**15,
+            "max_chain": 128,
+            "nice_length": 128,
+            "max_lazy": 16,
+            "good_length": 8,
+            "block_split_observations": 512,
+        },
+        7: {
+            "match_finder": "hash_chain",
+            "strategy": "lazy",
+            "window_size": 2**15,
+            "max_chain": 256,
+            "nice_length": 128,
+            "max_lazy": 32,
+            "good_length": 8,
+            "block_split_observations": 512,
+        },
+        8: {
+            "match_finder": "binary_tree",
+            "strategy": "lazy",
+            "window_size": 2**15,
+            "max_chain": 256,
+            "nice_length": 258,
+            "max_lazy": 128,
+            "good_length": 32,
+            "block_split_observations": 512,
+        },
+        9: {
+            "match_finder": "binary_tree",
+            "strategy": "optimal",
+            "window_size": 2**15,
+            "max_chain": 256,
+            "nice_length": 258,
+            "iterations": 4,
+            "block_split_observations": 512,
+        },
+    }
+    DEFAULT_LEVEL = 6
+
     @classmethod
-    def compress(cls, data: bytes) -> bytes:
+    def compress(
+        cls,
+        data: bytes,
+        level: int = DEFAULT_LEVEL,
+        zdict: bytes | None = None,
+        workers: int | None = 1,
+        long_window_size: int | None = None,
+        statistics=None,
+    ) -> bytes:
         """
         For each block of size 32KB, compress it using one of 3 options.
         Block headers:
             00 - no compression
             01 - compressed with fixed Huffman codes
             10 - compressed with dynamic Huffman codes
-            11 - reserved (error)
+            11 - compressed with dynamic Huffman codes and the extended distance
+                 alphabet of long range mode
         :param data:
+        :param level: Compression level from 0 (stored, no compression) through
+            1 (fastest) to 9 (best compression), see ``LEVELS``.
+        :param zdict: Preset dictionary, like zlib's zdict: bytes the data is likely
+            to share, such as a template of similar messages. Matches may refer into
+            its last 32 KiB. Its index is cached, so repeated calls with the same
+            dictionary only pay for indexing once. ``decompress`` needs the same
+            dictionary.
+        :param workers: Number of processes searching for matches in large inputs,
+            None for one per CPU, see ``LZ77Compressor.encode``. The token streams of
+            the processes are joined before they are split into blocks.
+        :param long_window_size: Enable long range mode, which also finds repeats up
+            to this many bytes back, at most ``LZ77Compressor.MAX_LONG_WINDOW_SIZE``.
+            Blocks with matches beyond 32 KiB use the extended distance alphabet.
+            ``decompress`` needs no option for it.
+        :param statistics: A ``MatchStatistics`` to count the match finder searches
+            and the tokens in, see ``LZ77Compressor.encode``.
         :return:
         """
-        # Split the data into blocks of 32KB
-        tokens = LZ77Compressor.encode(data)
-        splitter = BlockSplitter()
-        blocks = []
-        current_block = []
+        if level not in cls.LEVELS:
+            raise ValueError("Compression level must be between 0 and 9.")
+        if cls.LEVELS[level] is None:
+            return cls._write_stored_blocks(BitWriter(), data).getvalue()
+
+        parameters = dict(cls.LEVELS[level])
+        block_split_observations = parameters.pop("block_split_observations")
+
+        # Tokens are consumed as they are produced, so only the current block is held
+        tokens = LZ77Compressor.iter_encode(
+            data,
+            token_model="deflate",
+            dictionary=zdict,
+            workers=workers,
+            long_window_size=long_window_size,
+            statistics=statistics,
+            **parameters,
+        )
+        return cls._encode_blocks(
+            data, tokens, BlockSplitter(block_split_observations), TokenArray()
+        ).getvalue()
+
+    @classmethod
+    def _encode_blocks(cls, data, tokens, splitter, current_block) -> BitWriter:
+        """
+        Split the tokens into blocks and encode each block as soon as it ends.
+
+        :param data: The input bytes the tokens cover.
+        :param tokens: Iterable of DEFLATE tokens.
+        :param splitter: The BlockSplitter deciding where blocks end, in its reset
+            state.
+        :param current_block: An empty TokenArray the tokens of a block are
+            collected in.
+        :return: The encoded blocks in a BitWriter.
+        """
+        res = BitWriter()
+        # Input span of the current block, in case it is cheaper to store it
+        block_start = 0
+        data_pos = 0
 
-        pos = 0
-        while pos < len(tokens):
-            token = tokens[pos]
+        for token in tokens:
+            data_pos += token[1] + (token[2] is not None)
 
             # Observe the token based on its type
             if token[0] == 0:  # Literal
@@ -268,115 +244,218 @@ class DeflateCompressor:
 
             # Check if we should end the current block
             if splitter.should_end_block(len(current_block)):
-                # Store the current block
-                blocks.append(current_block)
+                res.extend(cls._encode_block(current_block, data[block_start:data_pos]))
+                block_start = data_pos
 
                 # Start a new block
-                current_block = []
+                current_block.clear()
                 splitter.reset()
 
-            pos += 1
-
         # Don't forget the last block
         if current_block:
-            blocks.append(current_block)
-        res = b""
-        for block_tokens in blocks:
-            # add block header based on: 00 - no compression, 01 - fixed, 10 - dynamic
-            literal_length_distance_pairs = []
-            # Encode each (distance, length, symbol) tuple into Deflate alphabets
-            for distance, length, symbol in block_tokens:
-                if distance != 0:
-                    # Encode lengths and distances
-                    length_symbol, length_extra_value = SymbolLengthAlphabet.encode(
-                        length
-                    )
-                    distance_symbol, distance_extra_value = DistanceAlphabet.encode(
-                        distance
-                    )
-                    literal_length_distance_pairs.append(
-                        (
-                            length_symbol,
-                            length_extra_value,
-                            distance_symbol,
-                            distance_extra_value,
-                        )
+            res.extend(cls._encode_block(current_block, data[block_start:data_pos]))
+        return res
+
+    @classmethod
+    def _encode_block(cls, block_tokens, block_data: bytes) -> BitWriter:
+        """
+        Encode one block of tokens with whichever of the stored, fixed and dynamic
+        encodings is smallest, including its header.
+
+        :param block_tokens: The (distance, length, next_character) tokens, as a
+            TokenArray or list.
+        :param block_data: The input bytes the tokens cover.
+        :return: The encoded block in a BitWriter.
+        """
+        # add block header based on: 00 - no compression, 01 - fixed, 10 - dynamic,
+        # 11 - dynamic with long range distances
+        # Every symbol is (literal/length symbol, its extra value and extra bit count,
+        # distance symbol or None, its extra value and extra bit count)
+        symbols = []
+        long_distances = False
+        # Encode each (distance, length, symbol) tuple into Deflate alphabets
+        for distance, length, symbol in block_tokens:
+            if distance != 0:
+                # Encode lengths and distances
+                symbols.append(
+                    (
+                        *SymbolLengthAlphabet.encode_length(length),
+                        *DistanceAlphabet.encode_distance(distance),
                     )
-                if symbol is not None:
-                    # Encode literals directly
-                    literal_length_distance_pairs.append((symbol, None, None, None))
-            # add end
-            literal_length_distance_pairs.append((256, None, None, None))
-            res_dynamic = b""
-            # Compress the literal/length and distance symbols using separate Huffman
-            # codes
-            literal_length_bit_lengths, literal_length_code = (
-                HuffmanCompressor.create_codes(
-                    [t[0] for t in literal_length_distance_pairs], alphabet_length=286
                 )
-            )
-            distance_bit_lengths, distance_code = HuffmanCompressor.create_codes(
-                [t[2] for t in literal_length_distance_pairs if t[2] is not None],
-                alphabet_length=30,
-            )
-            # write the trees, compressed literal/length and distance
-            res_dynamic += IntegerCompressor.encode(
+                long_distances |= distance > LZ77Compressor.MAX_WINDOW_SIZE
+            if symbol is not None:
+                # Encode literals directly
+                symbols.append((symbol, 0, 0, None, 0, 0))
+        # add end
+        symbols.append((256, 0, 0, None, 0, 0))
+        distance_table = DistanceAlphabet.DISTANCE_TABLE
+        if long_distances:
+            distance_table = DistanceAlphabet.LONG_DISTANCE_TABLE
+
+        # Compress the literal/length and distance symbols using separate Huffman codes
+        literal_length_bit_lengths = HuffmanCompressor.create_code_lengths(
+            [t[0] for t in symbols], alphabet_length=286
+        )
+        distance_bit_lengths = HuffmanCompressor.create_code_lengths(
+            [t[3] for t in symbols if t[3] is not None],
+            alphabet_length=len(distance_table),
+        )
+        # write the header, the trees, compressed literal/length and distance
+        res_dynamic = BitWriter()
+        res_dynamic.write(0b11 if long_distances else 0b10, 2)
+        res_dynamic.write_bit_string(
+            IntegerCompressor.encode(
                 [*literal_length_bit_lengths, *distance_bit_lengths]
             )
-            for (
-                literal_length,
-                literal_length_extra_value,
-                distance,
-                distance_extra_value,
-            ) in literal_length_distance_pairs:
-                res_dynamic += literal_length_code[literal_length]
-                if literal_length_extra_value is not None:
-                    res_dynamic += literal_length_extra_value
-                if distance is not None:
-                    res_dynamic += distance_code[distance]
-                    res_dynamic += distance_extra_value
-            res_fixed = b""
-            # Compress with fixed codes
-            for (
-                literal_length,
-                literal_length_extra_value,
-                distance,
-                distance_extra_value,
-            ) in literal_length_distance_pairs:
-                res_fixed += FIXED_LENGTH_TO_CODE[literal_length]
-                if literal_length_extra_value is not None:
-                    res_fixed += literal_length_extra_value
-                if distance is not None:
-                    res_fixed += FIXED_DISTANCE_TO_CODE[distance]
-                    res_fixed += distance_extra_value
-
-            if len(res_dynamic) > len(res_fixed):
-                res += b"01" + res_fixed
-            else:
-                res += b"10" + res_dynamic
-        return binary_string_to_bytes(res)
+        )
+        cls._write_symbols(
+            res_dynamic,
+            symbols,
+            HuffmanCompressor.generate_canonical_codes(literal_length_bit_lengths),
+            literal_length_bit_lengths,
+            HuffmanCompressor.generate_canonical_codes(distance_bit_lengths),
+            distance_bit_lengths,
+        )
+
+        stored_length = cls._stored_blocks_length(len(block_data))
+        if long_distances:
+            # The fixed distance codes only cover the DEFLATE distance alphabet
+            if stored_length < len(res_dynamic):
+                return cls._write_stored_blocks(BitWriter(), block_data)
+            return res_dynamic
+
+        # Compress with fixed codes
+        res_fixed = BitWriter()
+        res_fixed.write(0b01, 2)
+        cls._write_symbols(
+            res_fixed,
+            symbols,
+            FIXED_LITERAL_LENGTH_CODES,
+            FIXED_LITERAL_LENGTH_BIT_LENGTHS,
+            FIXED_DISTANCE_CODES,
+            FIXED_DISTANCE_BIT_LENGTHS,
+        )
+
+        if stored_length < min(len(res_fixed), len(res_dynamic)):
+            return cls._write_stored_blocks(BitWriter(), block_data)
+        if len(res_dynamic) > len(res_fixed):
+            return res_fixed
+        return res_dynamic
+
+    @classmethod
+    def _write_symbols(
+        cls,
+        writer,
+        symbols,
+        literal_length_codes,
+        literal_length_bit_lengths,
+        distance_codes,
+        distance_bit_lengths,
+    ) -> None:
+        """Write the symbols of a block and their extra bits with the given codes."""
+        write = writer.write
+        for (
+            literal_length,
+            length_extra_value,
+            length_extra_bits,
+            distance,
+            distance_extra_value,
+            distance_extra_bits,
+        ) in symbols:
+            # A code and its extra bits are shifted in together
+            write(
+                (literal_length_codes[literal_length] << length_extra_bits)
+                | length_extra_value,
+                literal_length_bit_lengths[literal_length] + length_extra_bits,
+            )
+            if distance is not None:
+                write(
+                    (distance_codes[distance] << distance_extra_bits)
+                    | distance_extra_value,
+                    distance_bit_lengths[distance] + distance_extra_bits,
+                )
 
     @classmethod
-    def decompress(cls, data: bytes) -> bytes:
-        # Convert bytes back to binary string format for processing
-        data = bytes_to_binary_string(data)
-        tokens = []
-        while data:
+    def _stored_blocks_length(cls, data_length: int) -> int:
+        """Number of bits ``_write_stored_blocks`` takes for this many bytes."""
+        full_blocks, last_block = divmod(data_length, cls.MAX_STORED_BLOCK_LENGTH)
+        length = full_blocks * (
+            2 + len(IntegerCompressor.encode([cls.MAX_STORED_BLOCK_LENGTH]))
+        )
+        if last_block:
+            length += 2 + len(IntegerCompressor.encode([last_block]))
+        return length + 8 * data_length
+
+    @classmethod
+    def _write_stored_blocks(cls, writer: BitWriter, data: bytes) -> BitWriter:
+        """
+        Encode data as uncompressed blocks: the header, the block length and the raw
+        bytes.
+
+        :return: ``writer``.
+        """
+        for start in range(0, len(data), cls.MAX_STORED_BLOCK_LENGTH):
+            block = data[start : start + cls.MAX_STORED_BLOCK_LENGTH]
+            writer.write(0b00, 2)
+            writer.write_bit_string(IntegerCompressor.encode([len(block)]))
+            writer.write(int.from_bytes(block, "big"), 8 * len(block))
+        return writer
+
+    @classmethod
+    def decompress(cls, data: bytes, zdict: bytes | None = None) -> bytes:
+        """
+        :param data: Data returned by ``compress``.
+        :param zdict: The preset dictionary the data was compressed with, if any.
+        :return: The original data.
+        """
+        tokens = cls._decode_blocks(BitReader(data), TokenArray())
+        return LZ77Compressor.decode(tokens, dictionary=zdict)
+
+    @classmethod
+    def _decode_blocks(cls, reader: BitReader, tokens):
+        """
+        Decode all blocks into DEFLATE tokens. Huffman symbols are decoded with the
+        two-level tables of ``HuffmanCompressor.generate_decode_table``, in one lookup
+        for all but the longest codes.
+
+        :param reader: BitReader over the blocks.
+        :param tokens: TokenArray the decoded tokens are appended to.
+        :return: ``tokens``.
+        """
+        decode_symbol = HuffmanCompressor.decode_symbol
+        length_table = SymbolLengthAlphabet.LENGTH_TABLE
+        append = tokens.append
+        while len(reader) > 0:
             # Read block header
-            block_header, data = data[:2], data[2:]
-            if block_header == b"10":
-                length_literal_bit_lengths, data = IntegerCompressor.decode(data, 286)
-                distance_bit_lengths, data = IntegerCompressor.decode(data, 30)
-                # Decompress using Huffman trees
-                length_literal_code = HuffmanCompressor.generate_decode_table(
-                    length_literal_bit_lengths
+            block_header = reader.read(2)
+            if block_header == 0b00:
+                (length,) = IntegerCompressor.read(reader, 1)
+                if 8 * length > len(reader):
+                    raise ValueError("Insufficient data to decode block")
+                stored = reader.read(8 * length).to_bytes(length, "big")
+                tokens.extend((0, 0, byte) for byte in stored)
+                continue
+            # Only dynamic blocks in long range mode use the extended distance codes,
+            # in fixed blocks codes 30 and 31 are invalid like in RFC 1951
+            distance_table = DistanceAlphabet.DISTANCE_TABLE
+            if block_header == 0b01:
+                literal_length_decode_table = FIXED_LITERAL_LENGTH_DECODE_TABLE
+                distance_decode_table = FIXED_DISTANCE_DECODE_TABLE
+            else:
+                if block_header == 0b11:
+                    distance_table = DistanceAlphabet.LONG_DISTANCE_TABLE
+                literal_length_bit_lengths = IntegerCompressor.read(reader, 286)
+                distance_bit_lengths = IntegerCompressor.read(
+                    reader, len(distance_table)
                 )
-                distance_code = HuffmanCompressor.generate_decode_table(
+                # Decompress using Huffman decode tables
+                literal_length_decode_table = HuffmanCompressor.generate_decode_table(
+                    literal_length_bit_lengths
+                )
+                distance_decode_table = HuffmanCompressor.generate_decode_table(
                     distance_bit_lengths
                 )
-            else:  # block_header == b'01':
-                length_literal_code = FIXED_CODE_TO_LENGTH
-                distance_code = FIXED_CODE_TO_DISTANCE
             """
             loop (until end of block code recognized)
                          decode literal/length value from input stream
@@ -390,25 +469,26 @@ class DeflateCompressor:
                       end loop
             """
             while True:
-                literal_length, data = HuffmanCompressor.decode_next(
-                    data, length_literal_code
-                )
+                # Past the end the input reads as zeros, which may decode forever
+                if reader.position > reader.length:
+                    raise ValueError("Insufficient data to decode block")
+                literal_length = decode_symbol(reader, *literal_length_decode_table)
                 if literal_length < 256:
-                    tokens.append((0, 0, literal_length))
+                    append((0, 0, literal_length))
                 elif literal_length == 256:
                     break
                 else:
-                    # format is length, distance, literal
-                    length, data = SymbolLengthAlphabet.decode(literal_length, data)
-                    distance_symbol, data = HuffmanCompressor.decode_next(
-                        data, distance_code
-                    )
-                    distance, data = DistanceAlphabet.decode(distance_symbol, data)
-                    literal, data = HuffmanCompressor.decode_next(
-                        data, length_literal_code
-                    )
-                    if literal == 256:
-                        tokens.append((distance, length, None))
-                        break
-                    tokens.append((distance, length, literal))
-        return LZ77Compressor.decode(tokens)
+                    # A match is a length and a distance, any literal after it is
+                    # decoded as a symbol of its own
+                    if literal_length > 285:
+                        raise ValueError("Invalid length symbol.")
+                    base, extra_bits = length_table[literal_length - 257]
+                    length = base + reader.read(extra_bits)
+                    distance_symbol = decode_symbol(reader, *distance_decode_table)
+                    if distance_symbol >= len(distance_table):
+                        raise ValueError("Invalid distance symbol.")
+                    base, extra_bits = distance_table[distance_symbol]
+                    append((base + reader.read(extra_bits), length, None))
+        if reader.position > reader.length:
+            raise ValueError("Insufficient data to decode block")
+        return tokens
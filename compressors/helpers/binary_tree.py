@@ -0,0 +1,156 @@
+class BinaryTreeMatchFinder:
+    """
+    A Python implementation of libdeflate's binary-tree match finder (bt_matchfinder).
+
+    Positions are grouped by a hash of their next three bytes, and each hash bucket is
+    a binary search tree of the positions in the window ordered by the strings that
+    start there. Inserting a position walks down the tree it belongs to, re-rooting it
+    at the new position, and every node visited on the way is a match candidate. The
+    longest matches lie along that path, so all matches of increasing length are found
+    in roughly logarithmic time instead of scanning the window. ``probes`` counts the
+    tree nodes visited by all searches and insertions.
+    """
+
+    HASH_BITS = 15
+    HASH_SHIFT = 5
+    MIN_MATCH_LENGTH = 3
+
+    def __init__(
+        self, window_size=2**15, max_chain=64, nice_length=258, min_match_length=3
+    ):
+        """
+        :param window_size: Size of the sliding window, must be a power of two.
+        :param max_chain: Maximum number of tree nodes visited per position.
+        :param nice_length: Stop searching once a match this long is found.
+        :param min_match_length: Shortest match that is reported.
+        """
+        if window_size & (window_size - 1):
+            raise ValueError("Window size must be a power of two.")
+
+        self.window_size = window_size
+        self.window_mask = window_size - 1
+        self.max_chain = max_chain
+        self.nice_length = nice_length
+        self.min_match_length = max(min_match_length, self.MIN_MATCH_LENGTH)
+        self.hash_mask = (1 << self.HASH_BITS) - 1
+
+        # Tree roots per hash, and left/right children of every window slot
+        self.head = [-1] * (1 << self.HASH_BITS)
+        self.children = [-1] * (2 * window_size)
+        self.probes = 0
+
+    def _hash(self, data, pos):
+        """Hash the three bytes starting at ``pos``."""
+        return (
+            (data[pos] << (2 * self.HASH_SHIFT))
+            ^ (data[pos + 1] << self.HASH_SHIFT)
+            ^ data[pos + 2]
+        ) & self.hash_mask
+
+    def _advance(self, data, pos, max_length, matches, max_chain=None):
+        """
+        Insert ``pos`` into its tree, appending every match longer than the previous
+        one to ``matches`` when it is not None.
+        """
+        children = self.children
+        window_mask = self.window_mask
+
+        h = self._hash(data, pos)
+        node = self.head[h]
+        self.head[h] = pos
+
+        # Slots where the next smaller / larger node must be linked
+        pending_lt = 2 * (pos & window_mask)
+        pending_gt = pending_lt + 1
+
+        limit = max(pos - self.window_size, -1)
+        nice_length = min(self.nice_length, max_length)
+        best_length = self.min_match_length - 1
+        best_lt_length = 0
+        best_gt_length = 0
+        length = 0
+        max_depth = depth = self.max_chain if max_chain is None else max_chain
+
+        while node > limit and depth > 0:
+            if data[node + length] == data[pos + length]:
+                length += 1
+                while (
+                    length < nice_length and data[node + length] == data[pos + length]
+                ):
+                    length += 1
+
+                if matches is not None and length > best_length:
+                    best_length = length
+                    matches.append((pos - node, length))
+
+                if length >= nice_length:
+                    # The new node replaces this one in the tree
+                    node_slot = 2 * (node & window_mask)
+                    children[pending_lt] = children[node_slot]
+                    children[pending_gt] = children[node_slot + 1]
+                    self.probes += max_depth - depth + 1
+                    return
+
+            if data[node + length] < data[pos + length]:
+                children[pending_lt] = node
+                pending_lt = 2 * (node & window_mask) + 1
+                node = children[pending_lt]
+                best_lt_length = length
+                length = min(length, best_gt_length)
+            else:
+                children[pending_gt] = node
+                pending_gt = 2 * (node & window_mask)
+                node = children[pending_gt]
+                best_gt_length = length
+                length = min(length, best_lt_length)
+
+            depth -= 1
+
+        self.probes += max_depth - depth
+        children[pending_lt] = -1
+        children[pending_gt] = -1
+
+    def skip(self, data, pos):
+        """Insert ``pos`` into its tree without recording matches."""
+        max_length = min(self.nice_length, len(data) - pos)
+        if max_length >= self.min_match_length:
+            self._advance(data, pos, max_length, None)
+
+    def find_matches(self, data, pos, max_length, max_chain=None):
+        """
+        Find all matches of increasing length for ``data[pos:pos + max_length]`` and
+        insert ``pos`` into its tree.
+
+        :return: A list of (distance, length) tuples sorted by increasing length.
+        """
+        matches = []
+        if max_length >= self.min_match_length:
+            self._advance(data, pos, max_length, matches, max_chain)
+        return matches
+
+    def find_longest_match(self, data, pos, max_length, max_chain=None):
+        """
+        Find the longest match for ``data[pos:pos + max_length]`` and insert ``pos``
+        into its tree.
+
+        :return: A tuple (distance, length), or (0, 0) if no match was found.
+        """
+        matches = self.find_matches(data, pos, max_length, max_chain)
+        if not matches:
+            return 0, 0
+        return matches[-1]
+
+    def restore(self, other) -> None:
+        """
+        Replace the index with a copy of ``other``'s, a finder with the same
+        parameters, reusing this finder's tables.
+        """
+        self.head[:] = other.head
+        self.children[:] = other.children
+
+    def reset(self) -> None:
+        """
+        Forget all indexed positions. Only the tree roots are cleared: inserting a
+        position sets both of its children, so stale links are unreachable.
+        """
+        self.head = [-1] * (1 << self.HASH_BITS)
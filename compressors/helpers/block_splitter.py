@@ -13,7 +13,14 @@ class BlockSplitter:
     NUM_OBSERVATIONS_PER_BLOCK_CHECK = 512
     MIN_BLOCK_LENGTH = 1000
 
-    def __init__(self):
+    def __init__(self, observations_per_block_check=NUM_OBSERVATIONS_PER_BLOCK_CHECK):
+        """
+        :param observations_per_block_check: Number of new observations collected
+            before each check for a block boundary. Lower values split more precisely
+            at the cost of more checks.
+        """
+        self.observations_per_block_check = observations_per_block_check
+
         # Initialize statistics
         self.observations = [0] * self.NUM_OBSERVATION_TYPES
         self.new_observations = [0] * self.NUM_OBSERVATION_TYPES
@@ -49,7 +56,7 @@ class BlockSplitter:
         """
         # First check if we have enough observations
         if (
-            self.num_new_observations < self.NUM_OBSERVATIONS_PER_BLOCK_CHECK
+            self.num_new_observations < self.observations_per_block_check
             or block_length < self.MIN_BLOCK_LENGTH
         ):
             return False
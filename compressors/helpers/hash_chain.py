@@ -0,0 +1,116 @@
+class HashChainMatchFinder:
+    """
+    A Python implementation of zlib's hash-chain match finder.
+
+    Every position is hashed on its next three bytes. ``head`` maps a hash to the most
+    recent position with that hash and ``prev`` links each position in the window to
+    the previous one with the same hash, so candidates are visited closest first and
+    the search at each position is bounded by ``max_chain`` probes. ``probes`` counts
+    the candidates visited by all searches.
+    """
+
+    HASH_BITS = 15
+    HASH_SHIFT = 5  # HASH_BITS / 3 rounded up, so the hash covers three bytes
+    MIN_MATCH_LENGTH = 3
+
+    def __init__(
+        self, window_size=2**15, max_chain=32, nice_length=258, min_match_length=3
+    ):
+        if window_size & (window_size - 1):
+            raise ValueError("Window size must be a power of two.")
+
+        self.window_size = window_size
+        self.window_mask = window_size - 1
+        self.max_chain = max_chain
+        self.nice_length = nice_length
+        self.min_match_length = max(min_match_length, self.MIN_MATCH_LENGTH)
+        self.hash_mask = (1 << self.HASH_BITS) - 1
+
+        self.head = [-1] * (1 << self.HASH_BITS)
+        self.prev = [-1] * window_size
+        self.probes = 0
+
+    def _hash(self, data, pos):
+        """Hash the three bytes starting at ``pos``."""
+        return (
+            (data[pos] << (2 * self.HASH_SHIFT))
+            ^ (data[pos + 1] << self.HASH_SHIFT)
+            ^ data[pos + 2]
+        ) & self.hash_mask
+
+    def skip(self, data, pos):
+        """Insert ``pos`` into the hash chains without searching for a match."""
+        if pos + self.MIN_MATCH_LENGTH <= len(data):
+            h = self._hash(data, pos)
+            self.prev[pos & self.window_mask] = self.head[h]
+            self.head[h] = pos
+
+    def find_longest_match(self, data, pos, max_length, max_chain=None):
+        """
+        Find the longest match for ``data[pos:pos + max_length]`` in the window and
+        insert ``pos`` into the hash chains.
+
+        :param data: The whole input buffer.
+        :param pos: The position to find a match for.
+        :param max_length: The maximum match length allowed at this position.
+        :param max_chain: Overrides the number of candidates probed for this search.
+        :return: A tuple (distance, length), or (0, 0) if no match was found.
+        """
+        if max_length < self.min_match_length:
+            self.skip(data, pos)
+            return 0, 0
+
+        h = self._hash(data, pos)
+        candidate = self.head[h]
+
+        prev = self.prev
+        window_mask = self.window_mask
+        nice_length = min(self.nice_length, max_length)
+        limit = pos - self.window_size
+        best_length = self.min_match_length - 1
+        best_distance = 0
+        max_probes = chain = self.max_chain if max_chain is None else max_chain
+
+        while candidate >= 0 and candidate >= limit and chain > 0:
+            # Cheap rejection: a longer match must agree on the byte past the best
+            if data[candidate + best_length] == data[pos + best_length]:
+                length = 0
+                while (
+                    length < max_length
+                    and data[candidate + length] == data[pos + length]
+                ):
+                    length += 1
+
+                if length > best_length:
+                    best_length = length
+                    best_distance = pos - candidate
+                    if length >= nice_length:
+                        break
+
+            candidate = prev[candidate & window_mask]
+            chain -= 1
+
+        # Link pos after the walk: a candidate exactly window_size back shares its
+        # prev slot, which would otherwise point the chain back at that candidate
+        prev[pos & window_mask] = self.head[h]
+        self.head[h] = pos
+
+        self.probes += max_probes - chain
+        if best_distance == 0:
+            return 0, 0
+        return best_distance, best_length
+
+    def restore(self, other) -> None:
+        """
+        Replace the index with a copy of ``other``'s, a finder with the same
+        parameters, reusing this finder's tables.
+        """
+        self.head[:] = other.head
+        self.prev[:] = other.prev
+
+    def reset(self) -> None:
+        """
+        Forget all indexed positions. Only the chain heads are cleared: every position
+        links its ``prev`` entry when it is inserted, so stale links are unreachable.
+        """
+        self.head = [-1] * (1 << self.HASH_BITS)
@@ -0,0 +1,108 @@
+class LongRangeMatchFinder:
+    """
+    Match finder for repeats far beyond the DEFLATE window, like zstd's long distance
+    matching.
+
+    The index is sparse: only every ``stride``-th position is inserted, keyed by the
+    hash of the ``block_length`` bytes starting there, so it holds one entry per
+    ``stride`` bytes of the window. Every position is looked up, which finds any
+    repeat of at least ``block_length + stride - 1`` bytes. A hit is verified and then
+    extended in both directions. The block hashes are CPython's hashes of bytes
+    slices, which are computed in C and cost less than a rolling hash updated byte by
+    byte in Python.
+    """
+
+    def __init__(self, window_size=2**24, block_length=64, stride=32):
+        """
+        :param window_size: Maximum match distance.
+        :param block_length: Number of bytes hashed per index entry, the shortest
+            repeat that can be found.
+        :param stride: Distance between indexed positions. Larger values make the
+            index smaller and miss more of the repeats shorter than
+            ``block_length + stride - 1`` bytes.
+        """
+        self.window_size = window_size
+        self.block_length = block_length
+        self.stride = stride
+        self.reset()
+
+    def _insert_until(self, data, end):
+        """Index the positions before ``end`` that are due."""
+        block_length = self.block_length
+        index = self.index
+        last = min(end, len(data) - block_length + 1)
+        for pos in range(self.indexed_end, last, self.stride):
+            index[hash(data[pos : pos + block_length])] = pos
+        if last > self.indexed_end:
+            self.indexed_end += (
+                -(-(last - self.indexed_end) // self.stride) * self.stride
+            )
+
+        # Forget the positions that left the window, keeping the index bounded
+        if len(index) > 2 * self.window_size // self.stride:
+            limit = end - self.window_size
+            self.index = {key: pos for key, pos in index.items() if pos >= limit}
+
+    def find_next_match(self, data, start, end):
+        """
+        Find the first long match that starts in ``[start, end)``.
+
+        :param data: The data to search, as bytes.
+        :param start: First position to search. The match is not extended backwards
+            beyond it.
+        :param end: The match must start before this position, it may run past it.
+        :return: A tuple (position, distance, length), or None if no match was found.
+        """
+        block_length = self.block_length
+        last = min(end, len(data) - block_length + 1)
+        block_start = start
+        while block_start < last:
+            # Index the positions before the next stride boundary, then look up every
+            # position up to it
+            self._insert_until(data, block_start)
+            index = self.index
+            block_end = min(last, self.indexed_end + 1)
+            for pos in range(block_start, block_end):
+                block = data[pos : pos + block_length]
+                candidate = index.get(hash(block))
+                if (
+                    candidate is not None
+                    and candidate < pos
+                    and pos - candidate <= self.window_size
+                    and data[candidate : candidate + block_length] == block
+                ):
+                    return self._extend(data, start, pos, candidate)
+            block_start = block_end
+        return None
+
+    def _extend(self, data, start, pos, candidate):
+        """Extend a verified block match at ``pos`` in both directions."""
+        distance = pos - candidate
+
+        # Extend forwards in chunks that double while they keep matching
+        length = self.block_length
+        limit = len(data) - pos
+        step = 64
+        while length < limit:
+            step = min(step, limit - length)
+            source = candidate + length
+            if data[source : source + step] == data[pos + length : pos + length + step]:
+                length += step
+                step *= 2
+            elif step > 1:
+                step //= 2
+            else:
+                break
+
+        # Extend backwards, at most back to the start of the search
+        while pos > start and candidate > 0 and data[pos - 1] == data[candidate - 1]:
+            pos -= 1
+            candidate -= 1
+            length += 1
+
+        return pos, distance, length
+
+    def reset(self) -> None:
+        """Clear the index."""
+        self.index = {}
+        self.indexed_end = 0
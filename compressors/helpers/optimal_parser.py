@@ -0,0 +1,249 @@
+from compressors.alphabets import DistanceAlphabet, SymbolLengthAlphabet
+from compressors.huffman import HuffmanCompressor
+
+
+class OptimalParser:
+    """
+    A near-optimal LZ77 parser in the style of Zopfli.
+
+    The input is parsed block by block. All match candidates of a block are collected
+    once from the match finder, then the cheapest parse is found as a shortest path
+    over the positions of the block, where the weight of each literal and match is its
+    size in bits. The bit costs start from the fixed Huffman codes and are re-derived
+    from the code lengths of the previous parse on every iteration, keeping the
+    cheapest parse seen.
+    """
+
+    LITERAL_LENGTH_ALPHABET_LENGTH = 286
+    DISTANCE_ALPHABET_LENGTH = 30
+
+    def __init__(
+        self,
+        finder,
+        lookahead_size=257,
+        iterations=4,
+        block_size=2**16,
+        nice_length=128,
+        trailing_literal=True,
+    ):
+        """
+        :param finder: Match finder used to collect candidates. Finders with a
+            ``find_matches`` method contribute every candidate length, others only
+            their longest match.
+        :param lookahead_size: Maximum match length.
+        :param iterations: Number of times each block is re-parsed with updated costs.
+        :param block_size: Number of input bytes parsed per block.
+        :param nice_length: Matches at least this long are only considered at their
+            full length, which bounds the work on highly repetitive data.
+        :param trailing_literal: Emit LZ77 triples, where every match carries the
+            byte after it as its next character. Otherwise matches and literals are
+            separate tokens, as in DEFLATE.
+        """
+        self.finder = finder
+        self.lookahead_size = lookahead_size
+        self.iterations = max(1, iterations)
+        self.block_size = block_size
+        self.nice_length = nice_length
+        self.trailing_literal = trailing_literal
+
+        # Length symbol and extra bit count for every match length
+        self.length_symbols = [0] * (lookahead_size + 2)
+        self.length_extra_bits = [0] * (lookahead_size + 2)
+        for i, (base, extra_bits) in enumerate(SymbolLengthAlphabet.LENGTH_TABLE):
+            for length in range(
+                base, min(base + (1 << extra_bits), lookahead_size + 2)
+            ):
+                self.length_symbols[length] = 257 + i
+                self.length_extra_bits[length] = extra_bits
+
+        # Distance symbol and extra bit count for every distance in the window
+        max_distance = finder.window_size
+        self.distance_symbols = [0] * (max_distance + 1)
+        self.distance_extra_bits = [0] * (max_distance + 1)
+        for code, (base, extra_bits) in enumerate(DistanceAlphabet.DISTANCE_TABLE):
+            for distance in range(
+                base, min(base + (1 << extra_bits), max_distance + 1)
+            ):
+                self.distance_symbols[distance] = code
+                self.distance_extra_bits[distance] = extra_bits
+
+    @classmethod
+    def _fixed_bit_lengths(cls):
+        """Code lengths of the fixed literal/length and distance Huffman codes."""
+        literal_length = [8] * 144 + [9] * 112 + [7] * 24 + [8] * 6
+        distance = [5] * cls.DISTANCE_ALPHABET_LENGTH
+        return literal_length, distance
+
+    @classmethod
+    def _costs_from_bit_lengths(cls, bit_lengths):
+        """Use code lengths as symbol costs, pricing unused symbols above all others."""
+        unused_cost = max(bit_lengths, default=0) + 1
+        return [length if length > 0 else unused_cost for length in bit_lengths]
+
+    def _collect_matches(self, data, start, end):
+        """Collect the match candidates of every position in ``[start, end)``."""
+        finder = self.finder
+        find_matches = getattr(finder, "find_matches", None)
+        n = len(data)
+        matches = []
+        for pos in range(start, end):
+            max_length = min(self.lookahead_size, n - pos)
+            if find_matches is not None:
+                matches.append(find_matches(data, pos, max_length))
+            else:
+                distance, length = finder.find_longest_match(data, pos, max_length)
+                matches.append([(distance, length)] if length > 0 else [])
+        return matches
+
+    def _parse_block(self, data, start, end, matches, literal_costs, distance_costs):
+        """Find the cheapest tokens covering ``[start, end)`` under the given costs."""
+        n = len(data)
+        size = end - start
+        length_symbols = self.length_symbols
+        length_extra_bits = self.length_extra_bits
+        distance_symbols = self.distance_symbols
+        distance_extra_bits = self.distance_extra_bits
+        nice_length = self.nice_length
+        trailing_literal = self.trailing_literal
+
+        infinity = float("inf")
+        cost = [infinity] * (size + 1)
+        cost[0] = 0
+        # (previous node, distance, length) of the cheapest edge into every node
+        choice = [None] * (size + 1)
+
+        for offset in range(size):
+            base_cost = cost[offset]
+            if base_cost == infinity:
+                continue
+            pos = start + offset
+
+            literal_cost = base_cost + literal_costs[data[pos]]
+            if literal_cost < cost[offset + 1]:
+                cost[offset + 1] = literal_cost
+                choice[offset + 1] = (offset, 0, 0)
+
+            # A trailing literal must fit in the block too, unless the match runs up to
+            # the end of the data
+            max_length = end - pos
+            if trailing_literal and end < n:
+                max_length -= 1
+            min_length = 3
+            for distance, longest in matches[offset]:
+                distance_cost = (
+                    base_cost
+                    + distance_costs[distance_symbols[distance]]
+                    + distance_extra_bits[distance]
+                )
+                longest = min(longest, max_length)
+                lengths = range(min_length, longest + 1)
+                if longest >= nice_length:
+                    lengths = (longest,)
+                for length in lengths:
+                    match_end = pos + length
+                    match_cost = (
+                        distance_cost
+                        + literal_costs[length_symbols[length]]
+                        + length_extra_bits[length]
+                    )
+                    if trailing_literal and match_end < n:
+                        match_cost += literal_costs[data[match_end]]
+                        node = offset + length + 1
+                    else:
+                        node = offset + length
+                    if match_cost < cost[node]:
+                        cost[node] = match_cost
+                        choice[node] = (offset, distance, length)
+                min_length = max(min_length, longest + 1)
+
+        # Walk the cheapest path back from the end of the block
+        tokens = []
+        node = size
+        while node > 0:
+            offset, distance, length = choice[node]
+            pos = start + offset
+            if length == 0:
+                tokens.append((0, 0, data[pos]))
+            else:
+                match_end = pos + length
+                next_character = None
+                if trailing_literal and match_end < n:
+                    next_character = data[match_end]
+                tokens.append((distance, length, next_character))
+            node = offset
+        tokens.reverse()
+        return tokens, cost[size]
+
+    def _block_bit_lengths(self, tokens):
+        """Huffman code lengths a block of tokens would be encoded with."""
+        literal_length_symbols = [256]
+        distance_symbols = []
+        for distance, length, next_character in tokens:
+            if length > 0:
+                literal_length_symbols.append(self.length_symbols[length])
+                distance_symbols.append(self.distance_symbols[distance])
+            if next_character is not None:
+                literal_length_symbols.append(next_character)
+        literal_length_bit_lengths = HuffmanCompressor.create_code_lengths(
+            literal_length_symbols, self.LITERAL_LENGTH_ALPHABET_LENGTH
+        )
+        if distance_symbols:
+            distance_bit_lengths = HuffmanCompressor.create_code_lengths(
+                distance_symbols, self.DISTANCE_ALPHABET_LENGTH
+            )
+        else:
+            distance_bit_lengths = [0] * self.DISTANCE_ALPHABET_LENGTH
+        return literal_length_bit_lengths, distance_bit_lengths
+
+    def parse(self, data, start=0, end=None):
+        """
+        Parse data into (distance, length, next_character) tokens.
+
+        :param data: The data to parse.
+        :param start: First position to parse. Earlier positions must already be
+            indexed by the match finder.
+        :param end: The tokens end exactly at this position, by default the end of
+            the data.
+        :return: The list of tokens.
+        """
+        if end is None:
+            end = len(data)
+        tokens = []
+        while start < end:
+            block_end = min(start + self.block_size, end)
+            matches = self._collect_matches(data, start, block_end)
+
+            bit_lengths = self._fixed_bit_lengths()
+            best_tokens, best_cost = None, None
+            for _ in range(self.iterations):
+                literal_costs = self._costs_from_bit_lengths(bit_lengths[0])
+                distance_costs = self._costs_from_bit_lengths(bit_lengths[1])
+                block_tokens, _ = self._parse_block(
+                    data, start, block_end, matches, literal_costs, distance_costs
+                )
+
+                # Price the parse with the codes it would actually be encoded with
+                bit_lengths = self._block_bit_lengths(block_tokens)
+                block_cost = self._parse_cost(block_tokens, bit_lengths)
+                if best_cost is None or block_cost < best_cost:
+                    best_tokens, best_cost = block_tokens, block_cost
+
+            tokens.extend(best_tokens)
+            start = block_end
+        return tokens
+
+    def _parse_cost(self, tokens, bit_lengths):
+        """Size in bits of ``tokens`` encoded with the given code lengths."""
+        literal_length_bit_lengths, distance_bit_lengths = bit_lengths
+        cost = literal_length_bit_lengths[256]
+        for distance, length, next_character in tokens:
+            if length > 0:
+                cost += (
+                    literal_length_bit_lengths[self.length_symbols[length]]
+                    + self.length_extra_bits[length]
+                    + distance_bit_lengths[self.distance_symbols[distance]]
+                    + self.distance_extra_bits[distance]
+                )
+            if next_character is not None:
+                cost += literal_length_bit_lengths[next_character]
+        return cost
@@ -0,0 +1,97 @@
+class RfindMatchFinder:
+    """
+    Match finder built on ``bytes.rfind``, which searches in C.
+
+    Whether a prefix of the lookahead occurs in the window is monotone in the prefix
+    length, so the longest match is found by galloping and then binary searching the
+    prefix length, with one ``rfind`` over the window per probe. The rightmost
+    occurrence is the closest one. Prefixes are passed as memoryview slices, so no
+    bytes are copied and there is no Python loop per byte. It keeps no index and needs
+    no dependencies.
+    """
+
+    MIN_MATCH_LENGTH = 3
+
+    def __init__(
+        self, window_size=2**15, max_chain=None, nice_length=258, min_match_length=3
+    ):
+        """
+        :param window_size: Maximum match distance.
+        :param max_chain: Accepted for the common match finder interface, every
+            search covers the whole window.
+        :param nice_length: Longest match searched for.
+        :param min_match_length: Shortest match that is reported.
+        """
+        self.window_size = window_size
+        self.max_chain = max_chain
+        self.nice_length = nice_length
+        self.min_match_length = max(min_match_length, self.MIN_MATCH_LENGTH)
+        self.reset()
+
+    def _view(self, data):
+        if data is not self._data:
+            self._data = data
+            self._memoryview = memoryview(data)
+        return self._memoryview
+
+    def skip(self, data, pos):
+        """The window is searched directly, so there is nothing to insert."""
+
+    def find_longest_match(self, data, pos, max_length, max_chain=None):
+        """
+        Find the longest match for ``data[pos:pos + max_length]`` that starts in the
+        window before ``pos``.
+
+        :return: A tuple (distance, length), or (0, 0) if no match was found.
+        """
+        max_length = min(max_length, self.nice_length)
+        length = self.min_match_length
+        if max_length < length or pos == 0:
+            return 0, 0
+
+        view = self._view(data)
+        start = max(0, pos - self.window_size)
+
+        # The match must start before pos, it may run into the lookahead
+        index = data.rfind(view[pos : pos + length], start, pos - 1 + length)
+        if index < 0:
+            return 0, 0
+
+        # Gallop to bracket the match length between found and missing prefixes
+        missing = max_length + 1
+        while length < max_length:
+            probe = min(2 * length, max_length)
+            probe_index = data.rfind(view[pos : pos + probe], start, pos - 1 + probe)
+            if probe_index < 0:
+                missing = probe
+                break
+            length, index = probe, probe_index
+
+        # Binary search between the longest found and the shortest missing prefix
+        while missing - length > 1:
+            probe = (length + missing) // 2
+            probe_index = data.rfind(view[pos : pos + probe], start, pos - 1 + probe)
+            if probe_index < 0:
+                missing = probe
+            else:
+                length, index = probe, probe_index
+
+        return pos - index, length
+
+    def restore(self, other) -> None:
+        """There is no index to copy, the finder is only reset."""
+        self.reset()
+
+    def release(self) -> None:
+        """
+        Release the view of the last searched buffer, so that a bytearray can be
+        resized once it is encoded. ``LZ77Compressor.encode`` calls it at the end.
+        """
+        if self._memoryview is not None:
+            self._memoryview.release()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the last searched buffer."""
+        self._data = None
+        self._memoryview = None
@@ -0,0 +1,108 @@
+from collections import Counter
+
+
+class MatchStatistics:
+    """
+    Counters of what ``LZ77Compressor.encode`` did, for tuning its parameters.
+
+    Pass an instance as the ``statistics`` argument of ``encode`` or ``iter_encode``
+    and read it once the tokens are consumed. Without it nothing is counted, so the
+    encoder runs unchanged.
+
+    ``positions_searched`` counts the match finder searches and
+    ``candidates_probed`` the candidates they visited, with a histogram of the
+    candidates visited per search in ``chain_depths``. Only the hash chain and binary
+    tree finders report their probes, and the "fast" and "rle" strategies use no
+    match finder at all. The token counters cover every strategy: ``match_lengths``
+    is a histogram of match lengths and ``distance_bits`` of the bit length of match
+    distances, so key ``k`` counts distances from ``2**(k - 1)`` to ``2**k - 1``.
+    """
+
+    def __init__(self):
+        self.positions_searched = 0
+        self.candidates_probed = 0
+        self.chain_depths = Counter()
+        self.match_lengths = Counter()
+        self.distance_bits = Counter()
+        self.literals = 0
+
+    @property
+    def matches(self) -> int:
+        """Number of match tokens."""
+        return self.match_lengths.total()
+
+    @property
+    def matched_bytes(self) -> int:
+        """Number of input bytes covered by matches."""
+        return sum(length * count for length, count in self.match_lengths.items())
+
+    @property
+    def literal_ratio(self) -> float:
+        """Share of the input bytes encoded as literals."""
+        total = self.literals + self.matched_bytes
+        return self.literals / total if total else 0.0
+
+    def observe_tokens(self, tokens):
+        """Count the tokens of an iterable while passing them on."""
+        match_lengths = self.match_lengths
+        distance_bits = self.distance_bits
+        for token in tokens:
+            distance, length, next_character = token
+            if length > 0:
+                match_lengths[length] += 1
+                distance_bits[distance.bit_length()] += 1
+            if next_character is not None:
+                self.literals += 1
+            yield token
+
+    def wrap(self, finder):
+        """Wrap a match finder so that its searches are counted."""
+        return CountingMatchFinder(finder, self)
+
+
+class CountingMatchFinder:
+    """
+    Match finder that forwards to another one and counts its searches in a
+    MatchStatistics.
+    """
+
+    def __init__(self, finder, statistics):
+        """
+        :param finder: The match finder to forward to.
+        :param statistics: The MatchStatistics to count in.
+        """
+        self.finder = finder
+        self.statistics = statistics
+        self.window_size = finder.window_size
+        self.max_chain = finder.max_chain
+        if hasattr(finder, "find_matches"):
+            self.find_matches = self._find_matches
+
+    def _count(self, probes_before):
+        statistics = self.statistics
+        statistics.positions_searched += 1
+        probes = getattr(self.finder, "probes", None)
+        if probes is not None:
+            statistics.candidates_probed += probes - probes_before
+            statistics.chain_depths[probes - probes_before] += 1
+
+    def skip(self, data, pos):
+        self.finder.skip(data, pos)
+
+    def find_longest_match(self, data, pos, max_length, max_chain=None):
+        probes_before = getattr(self.finder, "probes", None)
+        match = self.finder.find_longest_match(data, pos, max_length, max_chain)
+        self._count(probes_before)
+        return match
+
+    def _find_matches(self, data, pos, max_length, max_chain=None):
+        probes_before = getattr(self.finder, "probes", None)
+        matches = self.finder.find_matches(data, pos, max_length, max_chain)
+        self._count(probes_before)
+        return matches
+
+    def restore(self, other) -> None:
+        self.finder.restore(other)
+
+    def reset(self) -> None:
+        self.finder.reset()
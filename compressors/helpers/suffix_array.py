@@ -0,0 +1,221 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the pure Python build is used without it
+    np = None
+
+
+def build_suffix_array(data, use_numpy=None):
+    """
+    Build the suffix array of ``data`` by prefix doubling.
+
+    Suffixes are sorted by their first ``k`` bytes for k = 1, 2, 4, ... using the ranks
+    of the previous round as sort keys, until every rank is unique. When NumPy is
+    available the sorting rounds run vectorised.
+
+    :param data: The bytes to index.
+    :param use_numpy: Force (True) or disable (False) the NumPy build. By default NumPy
+        is used if it is installed.
+    :return: A tuple (suffix array, rank array) as ``array('i')``, 4 bytes per input
+        byte each.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy and np is None:
+        raise ValueError("NumPy is not installed.")
+
+    n = len(data)
+    if n == 0:
+        return array("i"), array("i")
+    if use_numpy:
+        return _build_suffix_array_numpy(data)
+
+    base = max(n, 256) + 1
+    rank = array("i", iter(data))
+    suffix_array = list(range(n))
+    k = 1
+    while True:
+        keys = [
+            rank[i] * base + (rank[i + k] + 1 if i + k < n else 0) for i in range(n)
+        ]
+        suffix_array.sort(key=keys.__getitem__)
+
+        current = 0
+        rank[suffix_array[0]] = 0
+        for j in range(1, n):
+            if keys[suffix_array[j]] != keys[suffix_array[j - 1]]:
+                current += 1
+            rank[suffix_array[j]] = current
+        del keys
+
+        if current == n - 1 or k >= n:
+            return array("i", suffix_array), rank
+        k *= 2
+
+
+def _build_suffix_array_numpy(data):
+    n = len(data)
+    base = max(n, 256) + 1
+    rank = np.frombuffer(bytes(data), dtype=np.uint8).astype(np.int32)
+    k = 1
+    while True:
+        # Only the sort keys need 64 bits, the ranks fit in 32
+        keys = rank * np.int64(base)
+        keys[: n - k] += rank[k:]
+        keys[: n - k] += 1
+        suffix_array = np.argsort(keys, kind="stable").astype(np.int32)
+
+        sorted_keys = keys[suffix_array]
+        del keys
+        changes = np.empty(n, dtype=np.int32)
+        changes[0] = 0
+        np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=changes[1:])
+        del sorted_keys
+        rank[suffix_array] = np.cumsum(changes, dtype=np.int32)
+        del changes
+
+        if rank[suffix_array[-1]] == n - 1 or k >= n:
+            return _to_array(suffix_array), _to_array(rank)
+        k *= 2
+
+
+def _to_array(values):
+    """Copy an int32 NumPy array into an ``array('i')``, which indexes faster."""
+    result = array("i")
+    result.frombytes(values.tobytes())
+    return result
+
+
+def build_lcp_array(data, suffix_array, rank):
+    """
+    Build the LCP array with Kasai's algorithm, where ``lcp[r]`` is the length of the
+    longest common prefix of the suffixes ranked ``r - 1`` and ``r``.
+    """
+    n = len(data)
+    lcp = array("i", bytes(4 * n))
+    h = 0
+    for i, r in enumerate(rank):
+        if r == 0:
+            h = 0
+            continue
+        j = suffix_array[r - 1]
+        limit = n - (i if i > j else j)
+        while h < limit and data[i + h] == data[j + h]:
+            h += 1
+        lcp[r] = h
+        if h > 0:
+            h -= 1
+    return lcp
+
+
+class SuffixArrayMatchFinder:
+    """
+    Whole-buffer match finder backed by a suffix array and LCP array.
+
+    The index is built once over the complete input the first time it is searched.
+    The longest match for a position is shared with its neighbours in suffix order,
+    so the search walks outwards from the position's rank in both directions, keeping
+    the running minimum of the LCP array as the match length, and stops at the first
+    suffix that starts inside the window before the position.
+    """
+
+    MIN_MATCH_LENGTH = 3
+
+    def __init__(
+        self,
+        window_size=2**15,
+        max_chain=256,
+        nice_length=258,
+        min_match_length=3,
+        use_numpy=None,
+    ):
+        """
+        :param window_size: Maximum match distance.
+        :param max_chain: Maximum number of suffixes visited in each direction.
+        :param nice_length: Accept a match this long without looking further.
+        :param min_match_length: Shortest match that is reported.
+        :param use_numpy: Build the suffix array with NumPy, see build_suffix_array.
+        """
+        self.window_size = window_size
+        self.max_chain = max_chain
+        self.nice_length = nice_length
+        self.min_match_length = max(min_match_length, self.MIN_MATCH_LENGTH)
+        self.use_numpy = use_numpy
+        self.reset()
+
+    def _prepare(self, data):
+        if data is self._data:
+            return
+        self._data = data
+        self.suffix_array, self.rank = build_suffix_array(data, self.use_numpy)
+        self.lcp = build_lcp_array(data, self.suffix_array, self.rank)
+
+    def skip(self, data, pos):
+        """The index covers the whole buffer, so there is nothing to insert."""
+
+    def find_longest_match(self, data, pos, max_length, max_chain=None):
+        """
+        Find the longest match for ``data[pos:pos + max_length]`` that starts at most
+        ``window_size`` bytes before ``pos``.
+
+        :return: A tuple (distance, length), or (0, 0) if no match was found.
+        """
+        if max_length < self.min_match_length:
+            return 0, 0
+        self._prepare(data)
+
+        suffix_array = self.suffix_array
+        lcp = self.lcp
+        n = len(suffix_array)
+        rank = self.rank[pos]
+        limit = pos - self.window_size
+        best_length = self.min_match_length - 1
+        best_distance = 0
+
+        # Walk towards smaller ranks, then towards larger ranks
+        for step in (-1, 1):
+            length = max_length
+            r = rank
+            steps = self.max_chain if max_chain is None else max_chain
+            while steps > 0:
+                if step < 0:
+                    if r == 0:
+                        break
+                    length = min(length, lcp[r])
+                    r -= 1
+                else:
+                    if r == n - 1:
+                        break
+                    r += 1
+                    length = min(length, lcp[r])
+
+                if length < best_length or length < self.min_match_length:
+                    break
+
+                candidate = suffix_array[r]
+                if limit <= candidate < pos:
+                    distance = pos - candidate
+                    if length > best_length or distance < best_distance:
+                        best_length = length
+                        best_distance = distance
+                    break
+                steps -= 1
+
+            if best_length >= self.nice_length:
+                break
+
+        if best_distance == 0:
+            return 0, 0
+        return best_distance, best_length
+
+    def restore(self, other) -> None:
+        """There is no index to copy, the finder is only reset."""
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop the index so it is rebuilt for the next buffer."""
+        self._data = None
+        self.suffix_array = array("i")
+        self.rank = array("i")
+        self.lcp = array("i")
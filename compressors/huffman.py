@@ -1,5 +1,6 @@
 from collections import Counter
-from heapq import heappop, heappush
+from heapq import merge
+from operator import itemgetter
 from typing import ClassVar
 
 ALPHABET = list(range(2**16))
@@ -8,6 +9,10 @@ ALPHABET = list(range(2**16))
 class HuffmanCompressor:
     FIXED_BYTE_TO_CODE: ClassVar[dict] = {}
     FIXED_CODE_TO_BYTE: ClassVar[dict] = {}
+    # Bits indexing the primary decode table, longer codes take a second lookup
+    DECODE_ROOT_BITS = 9
+    # Longest code length RFC 1951 allows
+    MAX_CODE_LENGTH = 15
 
     def __init__(self):
         super().__init__()
@@ -17,37 +22,138 @@ class HuffmanCompressor:
         return Counter(data)
 
     @classmethod
-    def _create_huffman_tree(cls, frequencies):
-        if len(frequencies) == 1:
-            (letter,) = frequencies
-            return {letter: 1}
-
-        queue = []
-        res = dict.fromkeys(frequencies, 0)
-        for letter, frequency in frequencies.items():
-            heappush(queue, (frequency, (letter,)))
-        while len(queue) > 1:
-            first_freq, first_letters = heappop(queue)
-            second_freq, second_letters = heappop(queue)
-            for letter in first_letters:
-                res[letter] = 1 + res[letter]
-
-            for letter in second_letters:
-                res[letter] = 1 + res[letter]
-
-            heappush(
-                queue, (first_freq + second_freq, (*first_letters, *second_letters))
+    def _create_huffman_tree(cls, frequencies, max_bits=None):
+        """
+        Compute the Huffman code length of every letter with Moffat and Katajainen's
+        in-place algorithm.
+
+        The letters are sorted by frequency once, which dominates the O(n log n)
+        cost. The tree is then built in a single array of weights: leaves and
+        internal nodes are both consumed in increasing weight order, so the next two
+        smallest nodes are always at the front of one of them, and each merged node
+        replaces its children with a parent index. A pass from the root turns the
+        parent indices into depths, and a last pass assigns the leaf depths.
+
+        :param frequencies: Mapping of letter to frequency.
+        :param max_bits: Longest code length allowed. Trees that are too deep are
+            replaced by the optimal length-limited code, see ``_package_merge``.
+        :return: A dict mapping every letter to its code length.
+        """
+        if len(frequencies) <= 1:
+            return dict.fromkeys(frequencies, 1)
+
+        # Ties are broken by letter, so the lengths don't depend on the input order
+        letters = sorted(sorted(frequencies), key=frequencies.__getitem__)
+        weights = [frequencies[letter] for letter in letters]
+        n = len(weights)
+
+        # Phase 1: weights[:node] become parent indices of the merged nodes
+        leaf = root = 0
+        for node in range(n - 1):
+            # First child
+            if leaf >= n or (root < node and weights[root] < weights[leaf]):
+                weight = weights[root]
+                weights[root] = node
+                root += 1
+            else:
+                weight = weights[leaf]
+                leaf += 1
+            # Second child
+            if leaf >= n or (root < node and weights[root] < weights[leaf]):
+                weights[node] = weight + weights[root]
+                weights[root] = node
+                root += 1
+            else:
+                weights[node] = weight + weights[leaf]
+                leaf += 1
+
+        # Phase 2: the depth of every internal node, from the root down
+        weights[n - 2] = 0
+        for node in range(n - 3, -1, -1):
+            weights[node] = weights[weights[node]] + 1
+
+        # Phase 3: the nodes available at each depth that aren't internal are leaves
+        available = 1
+        depth = 0
+        root = n - 2
+        node = n - 1
+        while available > 0:
+            used = 0
+            while root >= 0 and weights[root] == depth:
+                used += 1
+                root -= 1
+            while available > used:
+                weights[node] = depth
+                node -= 1
+                available -= 1
+            available = 2 * used
+            depth += 1
+
+        # The least frequent letter is the deepest
+        if max_bits is not None and weights[0] > max_bits:
+            weights = cls._package_merge(
+                [frequencies[letter] for letter in letters], max_bits
             )
+        return dict(zip(letters, weights, strict=True))
+
+    @classmethod
+    def _package_merge(cls, weights, max_bits):
+        """
+        Compute optimal code lengths of at most ``max_bits`` bits with the
+        package-merge algorithm of Larmore and Hirschberg.
 
-        return res
+        Starting from the leaves sorted by weight, every round pairs up the cheapest
+        items of the previous list into packages and merges them with the leaves
+        again. After ``max_bits - 1`` rounds, the ``2n - 2`` cheapest items are the
+        optimal choice, and the code length of a letter is the number of times its
+        leaf occurs in them. Packages point to the two items they are made of, so
+        the leaves are only counted once at the end.
+
+        :param weights: Letter weights in increasing order.
+        :param max_bits: Longest code length allowed, with ``2**max_bits`` at least
+            the number of letters.
+        :return: The code lengths in the order of ``weights``.
+        """
+        n = len(weights)
+        if n > 1 << max_bits:
+            raise ValueError(f"{n} letters don't fit in codes of {max_bits} bits.")
+
+        # A leaf is (weight, index), a package is (weight, first item, second item)
+        leaves = [(weight, index) for index, weight in enumerate(weights)]
+        items = leaves
+        for _ in range(max_bits - 1):
+            packages = [
+                (items[k][0] + items[k + 1][0], items[k], items[k + 1])
+                for k in range(0, len(items) - 1, 2)
+            ]
+            items = list(merge(leaves, packages, key=itemgetter(0)))
+
+        lengths = [0] * n
+        stack = items[: 2 * n - 2]
+        while stack:
+            item = stack.pop()
+            if len(item) == 2:
+                lengths[item[1]] += 1
+            else:
+                stack.append(item[1])
+                stack.append(item[2])
+        return lengths
 
     @classmethod
-    def generate_dynamic_huffman_codes(cls, bit_lengths):
+    def generate_canonical_codes(cls, bit_lengths, reverse=False):
         """
-        Generate Huffman codes based on the bit lengths using the Deflate algorithm.
+        Generate the canonical Huffman codes of the bit lengths as integers, using the
+        Deflate algorithm.
+
+        :param bit_lengths: Code length of every symbol, 0 for unused symbols.
+        :param reverse: Reverse the bits of every code, for output written least
+            significant bit first like RFC 1951 streams.
+        :return: The code of every symbol, 0 for unused symbols. Symbol ``i`` is
+            written as the ``bit_lengths[i]`` low bits of ``codes[i]``.
         """
+        codes = [0] * len(bit_lengths)
         if not bit_lengths or max(bit_lengths) == 0:
-            return {}
+            return codes
 
         # Step 1: Count the number of codes for each bit length
         max_bits = max(bit_lengths)
@@ -65,25 +171,120 @@ class HuffmanCompressor:
             code += bl_count[bits]
 
         # Step 3: Assign codes to symbols
-        codes = {}
-        for i in range(len(bit_lengths)):
-            length = bit_lengths[i]
+        for i, length in enumerate(bit_lengths):
             if length > 0:
-                codes[i] = f"{next_code[length]:0{length}b}".encode()
+                code = next_code[length]
                 next_code[length] += 1
+                if reverse:
+                    code = int(f"{code:0{length}b}"[::-1], 2)
+                codes[i] = code
 
         return codes
 
     @classmethod
-    def generate_decode_table(cls, bit_lengths):
+    def generate_dynamic_huffman_codes(cls, bit_lengths):
+        """
+        Generate Huffman codes based on the bit lengths using the Deflate algorithm.
+
+        :return: A dict of symbol to code, as an ASCII bit string.
+        """
+        codes = cls.generate_canonical_codes(bit_lengths)
+        return {
+            symbol: f"{code:0{length}b}".encode()
+            for symbol, (code, length) in enumerate(
+                zip(codes, bit_lengths, strict=True)
+            )
+            if length > 0
+        }
+
+    @classmethod
+    def generate_decode_table(cls, bit_lengths, root_bits=None):
+        """
+        Generate a two-level table for decoding with a BitReader, like zlib's inflate.
+
+        The primary table is indexed by the next ``root_bits`` bits of the input.
+        Every code up to ``root_bits`` long fills the entries of all the bit patterns
+        it is a prefix of, so one lookup gives the symbol and its code length. The
+        entry for the first ``root_bits`` bits of longer codes links to a subtable,
+        indexed by the following bits, that is filled the same way. Only the rare
+        long codes take a second lookup, and the tables stay small to build: a flat
+        table for 15 bit codes would have 32768 entries.
+
+        :param bit_lengths: Code length of every symbol, 0 for unused symbols. Codes
+            longer than ``MAX_CODE_LENGTH`` bits, or more codes than fit in a prefix
+            code, raise ValueError, as the lengths may come from corrupted data.
+        :param root_bits: Bits indexing the primary table, ``DECODE_ROOT_BITS`` by
+            default. It is lowered to the length of the longest code.
+        :return: A tuple (table, root_bits). Each entry is a tuple (symbol, code
+            length), a tuple (subtable, -subtable bits) for a link, or None for bit
+            patterns that start no code. Subtable entries hold the code length
+            beyond ``root_bits``.
+        """
+        max_bits = max(bit_lengths, default=0)
+        if max_bits > cls.MAX_CODE_LENGTH:
+            raise ValueError(
+                f"Code lengths must be at most {cls.MAX_CODE_LENGTH} bits, "
+                f"got {max_bits}."
+            )
+        # Kraft inequality, with the code space counted in codes of the longest length
+        used = sum(1 << (max_bits - length) for length in bit_lengths if length)
+        if used > 1 << max_bits:
+            raise ValueError("Code lengths are over-subscribed.")
+
+        if root_bits is None:
+            root_bits = cls.DECODE_ROOT_BITS
+        root_bits = min(root_bits, max_bits)
+        table = [None] * (1 << root_bits)
+        codes = cls.generate_canonical_codes(bit_lengths)
+        long_codes = []
+        subtable_bits = {}
+        for symbol, (code, length) in enumerate(zip(codes, bit_lengths, strict=True)):
+            if length == 0:
+                continue
+            fill = root_bits - length
+            if fill > 0:
+                start = code << fill
+                table[start : start + (1 << fill)] = [(symbol, length)] * (1 << fill)
+            elif fill == 0:
+                table[code] = (symbol, length)
+            else:
+                # A subtable is as deep as the longest code sharing its prefix
+                prefix = code >> -fill
+                if subtable_bits.get(prefix, 0) < -fill:
+                    subtable_bits[prefix] = -fill
+                long_codes.append((symbol, code, length))
+
+        for prefix, bits in subtable_bits.items():
+            table[prefix] = ([None] * (1 << bits), -bits)
+        for symbol, code, length in long_codes:
+            length -= root_bits
+            subtable, bits = table[code >> length]
+            fill = -bits - length
+            start = (code & ((1 << length) - 1)) << fill
+            if fill:
+                subtable[start : start + (1 << fill)] = [(symbol, length)] * (1 << fill)
+            else:
+                subtable[start] = (symbol, length)
+        return table, root_bits
+
+    @classmethod
+    def decode_symbol(cls, reader, table, root_bits):
         """
-        Generate a decoding table for reverse mapping from codes to symbols.
+        Decode the next symbol from a BitReader with a ``generate_decode_table``
+        table.
         """
-        codes = cls.generate_dynamic_huffman_codes(bit_lengths)
-        decode_table = {}
-        for symbol, code in codes.items():
-            decode_table[code] = symbol
-        return decode_table
+        entry = table[reader.peek(root_bits)]
+        if entry is None:
+            raise ValueError("No valid Huffman code found in data")
+        symbol, length = entry
+        if length < 0:
+            reader.skip(root_bits)
+            entry = symbol[reader.peek(-length)]
+            if entry is None:
+                raise ValueError("No valid Huffman code found in data")
+            symbol, length = entry
+        reader.skip(length)
+        return symbol
 
     @classmethod
     def encode(cls, data, alphabet_length=None, compress_counts=False):
@@ -96,10 +297,7 @@ class HuffmanCompressor:
             code_lengths[letter] if letter in code_lengths else 0
             for letter in range(alphabet_length)
         ]
-        codes = {
-            letter: code
-            for code, letter in cls.generate_decode_table(code_lengths).items()
-        }  # todo: fix
+        codes = cls.generate_dynamic_huffman_codes(code_lengths)
         # convert series of 0s to two numbers
         zero_count = 0
         code_lengths_compact = []
@@ -121,23 +319,42 @@ class HuffmanCompressor:
         return code_lengths, encoded_data
 
     @classmethod
-    def create_codes(cls, data, alphabet_length):
+    def create_code_lengths(cls, data, alphabet_length, max_bits=15):
+        """
+        Compute the Huffman code lengths of the letters in ``data``, for
+        ``generate_canonical_codes``.
+
+        :param data: The letters to encode.
+        :param alphabet_length: Number of letters in the alphabet.
+        :param max_bits: Longest code length allowed, 15 like RFC 1951, or None for
+            no limit.
+        :return: The code length of every letter, 0 for letters not in ``data``.
+        """
         code_lengths = cls._create_huffman_tree(
-            cls._calculate_empirical_frequency(data)
+            cls._calculate_empirical_frequency(data), max_bits
         )
-        code_lengths = [
-            code_lengths[letter] if letter in code_lengths else 0
-            for letter in range(alphabet_length)
-        ]
-        codes = {
-            letter: code
-            for code, letter in cls.generate_decode_table(code_lengths).items()
-        }  # todo: fix
+        return [code_lengths.get(letter, 0) for letter in range(alphabet_length)]
+
+    @classmethod
+    def create_codes(cls, data, alphabet_length, max_bits=15):
+        """
+        Create the Huffman code of the letters in ``data``.
+
+        :param data: The letters to encode.
+        :param alphabet_length: Number of letters in the alphabet.
+        :param max_bits: Longest code length allowed, see ``create_code_lengths``.
+        :return: A tuple (code lengths of every letter, dict of letter to code).
+        """
+        code_lengths = cls.create_code_lengths(data, alphabet_length, max_bits)
+        codes = cls.generate_dynamic_huffman_codes(code_lengths)
         return code_lengths, codes
 
     @classmethod
     def decode(cls, data, bit_lengths):
-        decode_table = cls.generate_decode_table(bit_lengths)
+        decode_table = {
+            code: symbol
+            for symbol, code in cls.generate_dynamic_huffman_codes(bit_lengths).items()
+        }
         current_bits = ""
         decoded_message = []
         for bit in data:
@@ -146,12 +363,3 @@ class HuffmanCompressor:
                 decoded_message.append(decode_table[current_bits])
                 current_bits = ""  # Reset current bits for the next symbol
         return decoded_message
-
-    @classmethod
-    def decode_next(cls, data, code):
-        current_bits = b""
-        for i, bit_char in enumerate(data):
-            current_bits += bytes([bit_char])
-            if current_bits in code:
-                return code[current_bits], data[i + 1 :]
-        raise ValueError("No valid Huffman code found in data")
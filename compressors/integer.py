@@ -36,3 +36,24 @@ class IntegerCompressor:
             if len(decoded_numbers) == length:
                 break
         return decoded_numbers, data
+
+    @classmethod
+    def read(cls, reader, length: int) -> list[int]:
+        """
+        Decode ``length`` numbers from a BitReader, like ``decode``.
+
+        :param reader: The BitReader positioned at the first number.
+        :param length: Number of numbers to decode.
+        :return: The numbers.
+        """
+        decoded_numbers = []
+        for _ in range(length):
+            num = 0
+            while reader.read(1):
+                num += 1
+                if num > len(reader):
+                    raise ValueError("Invalid integer encoding: no terminator found")
+            decoded_numbers.append(reader.read(num))
+        if reader.position > reader.length:
+            raise ValueError("Invalid integer encoding: insufficient data")
+        return decoded_numbers
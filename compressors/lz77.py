@@ -1,7 +1,109 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import ClassVar
+
+from compressors.helpers.binary_tree import BinaryTreeMatchFinder
+from compressors.helpers.hash_chain import HashChainMatchFinder
+from compressors.helpers.long_range import LongRangeMatchFinder
+from compressors.helpers.optimal_parser import OptimalParser
+from compressors.helpers.rfind import RfindMatchFinder
+from compressors.helpers.suffix_array import SuffixArrayMatchFinder
+from compressors.tokens import TokenArray
+
+
+class KMPMatchFinder:
+    """
+    Match finder that scans the whole search window with the partial KMP search.
+    It keeps no index, so every search costs time linear in the window size. The
+    window and lookahead are searched in place by offset, without copying them.
+    """
+
+    def __init__(
+        self, window_size=2**9, max_chain=None, nice_length=258, min_match_length=3
+    ):
+        """
+        ``max_chain`` and ``nice_length`` are accepted for the common match finder
+        interface, the scan always covers the whole window.
+        """
+        self.window_size = window_size
+        self.max_chain = window_size
+        self.nice_length = nice_length
+        self.min_match_length = min_match_length
+
+    def skip(self, data, pos):
+        """The KMP scan keeps no index, so there is nothing to insert."""
+
+    def find_longest_match(self, data, pos, max_length, max_chain=None):
+        """
+        Find the longest match for ``data[pos:pos + max_length]`` in the window.
+        The scan always covers the whole window, so ``max_chain`` is ignored.
+
+        :return: A tuple (distance, length), or (0, 0) if no match was found.
+        """
+        if max_length < self.min_match_length:
+            return 0, 0
+
+        match_index, match_length = LZ77Compressor._partial_kmp_search(
+            data,
+            data,
+            min_match_length=self.min_match_length,
+            start=max(0, pos - self.window_size),
+            end=pos,
+            pattern_start=pos,
+            pattern_end=pos + max_length,
+        )
+        if match_length == 0:
+            return 0, 0
+        return pos - match_index, match_length
+
+    def restore(self, other) -> None:
+        """The KMP scan keeps no index, so there is nothing to copy."""
+
+    def reset(self) -> None:
+        """The KMP scan keeps no state between searches."""
+
+
 class LZ77Compressor:
+    MATCH_FINDERS: ClassVar[dict] = {
+        "kmp": KMPMatchFinder,
+        "hash_chain": HashChainMatchFinder,
+        "binary_tree": BinaryTreeMatchFinder,
+        "suffix_array": SuffixArrayMatchFinder,
+        "rfind": RfindMatchFinder,
+    }
+    STRATEGIES = ("greedy", "lazy", "optimal", "fast", "rle")
+    TOKEN_MODELS = ("triple", "deflate")
+    # Largest distance the DEFLATE distance alphabet can encode
+    MAX_WINDOW_SIZE = 2**15
+    # Largest distance the extended distance alphabet of long range mode can encode
+    MAX_LONG_WINDOW_SIZE = 2**26
+    # Longest match DEFLATE can encode
+    MAX_MATCH_LENGTH = 258
+    # Number of indexed preset dictionaries kept for reuse
+    DICTIONARY_CACHE_SIZE = 8
+    # Fast strategy: hash table size, and number of misses before the step grows
+    FAST_HASH_BITS = 14
+    FAST_SKIP_TRIGGER = 6
+    # Longest repeating pattern recognised by the run detector
+    RLE_MAX_PERIOD = 8
+    # Number of input bytes iter_encode encodes per step
+    SEGMENT_SIZE = 2**16
+    # Number of input bytes each worker process encodes at a time
+    CHUNK_SIZE = 2**22
+
     @classmethod
     def _partial_kmp_search(
-        cls, search_string, pattern, stop_after=2**20, min_match_length=3
+        cls,
+        search_string,
+        pattern,
+        stop_after=2**20,
+        min_match_length=3,
+        start=0,
+        end=None,
+        pattern_start=0,
+        pattern_end=None,
     ):
         """
         Custom version of the KMP algorithm that finds the longest partial match
@@ -10,59 +112,71 @@ class LZ77Compressor:
         :param search_string: The string to search within.
         :param pattern: The pattern to search for.
         :param stop_after: Stop searching after this many characters. Default is infinity.
-        :return: A tuple (index of the match, length of the match).
+        :param start: Only search ``search_string[start:end]``, in place.
+        :param end: End of the searched range, by default the end of the string.
+        :param pattern_start: The pattern is ``pattern[pattern_start:pattern_end]``,
+            read in place so the window and lookahead can share one buffer.
+        :param pattern_end: End of the pattern, by default the end of ``pattern``.
+        :return: A tuple (index of the match in search_string, length of the match).
         """
-        n = len(search_string)
-        m = len(pattern)
+        n = len(search_string) if end is None else end
+        if pattern_end is None:
+            pattern_end = len(pattern)
 
         # Preprocess the pattern to generate the KMP table
-        table = cls._kmp_preprocess_pattern(pattern)
+        table = cls._kmp_preprocess_pattern(pattern, pattern_start, pattern_end)
 
-        i = 0  # Index in the pattern
-        j = 0  # Index in the search string
+        # Index in the pattern, kept absolute so the hot comparison needs no offset
+        i = pattern_start
+        j = start  # Index in the search string
+        stop = start + stop_after - pattern_start
 
         longest_match_length = 0
         longest_match_index = -1
 
         while j < n:
-            if j - i >= stop_after:
+            if j - i >= stop:
                 break
 
             if pattern[i] == search_string[j]:
                 i += 1
                 j += 1
-                if i == m:  # Full match found
-                    return j - i, i
+                if i == pattern_end:  # Full match found
+                    return j - i + pattern_start, i - pattern_start
             else:
-                if i == 0:
+                if i == pattern_start:
                     j += 1
                 else:
-                    if i > longest_match_length:
-                        longest_match_length = i
-                        longest_match_index = j - i
+                    if i - pattern_start > longest_match_length:
+                        longest_match_length = i - pattern_start
+                        longest_match_index = j - longest_match_length
 
-                    i = table[i - 1]
+                    i = pattern_start + table[i - pattern_start - 1]
 
         if longest_match_length >= min_match_length:
             return longest_match_index, longest_match_length
         return longest_match_index, 0
 
     @classmethod
-    def _kmp_preprocess_pattern(cls, pattern):
+    def _kmp_preprocess_pattern(cls, pattern, start=0, end=None):
         """
         Preprocess the pattern to generate the KMP skip table.
 
         :param pattern: The pattern to preprocess.
+        :param start: The pattern is ``pattern[start:end]``, read in place.
+        :param end: End of the pattern, by default the end of ``pattern``.
         :return: The skip table as a list of integers.
         """
-        m = len(pattern)
+        if end is None:
+            end = len(pattern)
+        m = end - start
         table = [0] * m
 
         i = 0  # Length of the previous longest prefix suffix
         j = 1  # Current index in the pattern
 
         while j < m:
-            if pattern[i] == pattern[j]:
+            if pattern[start + i] == pattern[start + j]:
                 i += 1
                 table[j] = i
                 j += 1
@@ -75,49 +189,823 @@ class LZ77Compressor:
         return table
 
     @classmethod
-    def encode(cls, data):
-        i = 0
-        n = len(data)
-        window_size = 2**9
-        lookahead_size = 257
-        min_match_length = 3
-        tokens = []
+    def create_match_finder(
+        cls,
+        match_finder,
+        window_size=2**15,
+        min_match_length=3,
+        max_chain=None,
+        nice_length=None,
+    ):
+        """
+        Create a match finder that can be passed to ``encode`` and reused across
+        calls.
+
+        :param match_finder: Name of the match finder, one of ``MATCH_FINDERS``.
+        :param max_chain: Search effort, by default the finder's own default.
+        :param nice_length: Length at which the search stops, by default the
+            finder's own default.
+        :return: The match finder.
+        """
+        if match_finder not in cls.MATCH_FINDERS:
+            raise ValueError(f"Unknown match finder: {match_finder!r}.")
+        parameters = {"window_size": window_size, "min_match_length": min_match_length}
+        if max_chain is not None:
+            parameters["max_chain"] = max_chain
+        if nice_length is not None:
+            parameters["nice_length"] = nice_length
+        return cls.MATCH_FINDERS[match_finder](**parameters)
+
+    @classmethod
+    def create_fast_table(cls):
+        """
+        Create a fast strategy hash table that can be passed to ``encode`` and reused
+        across calls.
+
+        :return: The hash table, with every slot empty.
+        """
+        return [-1] * (1 << cls.FAST_HASH_BITS)
+
+    @classmethod
+    def encode(
+        cls,
+        data,
+        match_finder="hash_chain",
+        strategy="greedy",
+        window_size=2**15,
+        max_chain=None,
+        nice_length=None,
+        max_lazy=16,
+        good_length=8,
+        iterations=4,
+        acceleration=1,
+        fast_table=None,
+        token_model="triple",
+        dictionary=None,
+        workers=1,
+        long_window_size=None,
+        statistics=None,
+    ):
+        """
+        Encode data into (distance, length, next_character) tokens.
+
+        The encoder works in place on the single input buffer: the match finders and
+        parsers take the buffer, a position and a length limit, and never slice the
+        search window or the lookahead out of it.
+
+        :param data: The data to encode, as bytes or bytearray. Other bytes-like
+            objects, such as memoryviews, are copied to bytes once, because the
+            searches use the C search methods of bytes.
+        :param match_finder: The match finder used to search the window, one of
+            ``MATCH_FINDERS``, or a finder from ``create_match_finder`` to reuse. A
+            reused finder keeps its own parameters and is reset before the search.
+        :param strategy: How matches are chosen, one of ``STRATEGIES``. "greedy" takes
+            the match found at each position, "lazy" first checks whether the next
+            position has a longer match, like zlib's deflate_slow. "optimal" finds
+            the cheapest parse of each block under a Huffman bit cost model, see
+            ``OptimalParser``; it is best combined with the "binary_tree" finder,
+            which reports every candidate length. "fast" probes a single hash table
+            slot per position and skips ahead faster the longer nothing matches,
+            like LZ4; it uses its own table and ignores ``match_finder``. "rle" only
+            emits runs of a repeating pattern of up to ``RLE_MAX_PERIOD`` bytes, like
+            zlib's Z_RLE, and ignores ``match_finder``.
+        :param window_size: Size of the search window, a power of two of at most
+            ``MAX_WINDOW_SIZE``. The indexed match finders keep the cost per byte
+            independent of the window size; the "kmp" finder scans the whole window.
+        :param max_chain: Search effort of the match finder, by default the finder's
+            own default.
+        :param nice_length: The match finder stops searching once it finds a match
+            this long, by default the finder's own default.
+        :param max_lazy: Lazy strategy only: matches at least this long are taken
+            without checking the next position.
+        :param good_length: Lazy strategy only: when the current match is at least
+            this long the next position is searched with a quarter of the effort.
+        :param iterations: Optimal strategy only: number of cost model refinements.
+        :param acceleration: Fast strategy only: initial step between probes, higher
+            values trade ratio for speed.
+        :param fast_table: Fast strategy only: a table from ``create_fast_table`` to
+            reuse. It is overwritten before the search instead of allocating a new
+            one, and is not used with several workers.
+        :param token_model: One of ``TOKEN_MODELS``. "triple" emits classic LZ77
+            triples, where every match carries the byte after it as its next
+            character and is at most 257 bytes long. "deflate" emits matches and
+            literals as separate tokens like RFC 1951: a match is (distance, length,
+            None), may be directly followed by another match and is at most 258
+            bytes long.
+        :param dictionary: Preset dictionary, bytes the data is likely to repeat.
+            Its last ``window_size`` bytes are treated as if they preceded the data,
+            so matches may reach back into it; ``decode`` needs the same dictionary.
+            The dictionary's index is built once and cached for later calls.
+        :param workers: Number of processes searching for matches, None for one per
+            CPU. With more than one, the data is split into chunks of ``CHUNK_SIZE``
+            bytes that are encoded in parallel, each with the ``window_size`` bytes
+            before it as its dictionary, so matches still reach back across chunk
+            boundaries. The tokens only differ from a single process where a match
+            would run past the end of a chunk. ``match_finder`` must then be a name.
+        :param long_window_size: Enable long range matching up to this distance, at
+            most ``MAX_LONG_WINDOW_SIZE``. Repeats of at least 64 bytes are then also
+            found far beyond ``window_size`` by a ``LongRangeMatchFinder``, and the
+            bytes between them are encoded as usual. With several workers, long
+            matches do not reach back across chunks.
+        :param statistics: A ``MatchStatistics`` to count the searches and tokens
+            in, off by default. With several workers only the tokens are counted.
+        :return: The tokens as a TokenArray.
+        """
+        return TokenArray(
+            cls.iter_encode(
+                data,
+                match_finder=match_finder,
+                strategy=strategy,
+                window_size=window_size,
+                max_chain=max_chain,
+                nice_length=nice_length,
+                max_lazy=max_lazy,
+                good_length=good_length,
+                iterations=iterations,
+                acceleration=acceleration,
+                fast_table=fast_table,
+                token_model=token_model,
+                dictionary=dictionary,
+                workers=workers,
+                long_window_size=long_window_size,
+                statistics=statistics,
+            )
+        )
+
+    @classmethod
+    def iter_encode(
+        cls,
+        data,
+        match_finder="hash_chain",
+        strategy="greedy",
+        window_size=2**15,
+        max_chain=None,
+        nice_length=None,
+        max_lazy=16,
+        good_length=8,
+        iterations=4,
+        acceleration=1,
+        fast_table=None,
+        token_model="triple",
+        dictionary=None,
+        segment_size=SEGMENT_SIZE,
+        workers=1,
+        chunk_size=CHUNK_SIZE,
+        long_window_size=None,
+        statistics=None,
+    ):
+        """
+        Encode data into tokens like ``encode``, but yield them incrementally.
+
+        The input is encoded one segment at a time and the tokens of a segment are
+        yielded before the next one is searched, so the tokens never have to be held
+        all at once. The match finder keeps indexing the same buffer across segments,
+        so its state stays bounded by the window and the tokens only differ from
+        ``encode`` where a match would cross a segment boundary.
 
-        while i < n:
-            # Define the search window and lookahead buffer
-            search_start = max(0, i - window_size)
-            search_window = data[search_start:i]
-            lookahead_buffer = data[i : i + lookahead_size]
+        :param data: The data to encode.
+        :param segment_size: Number of input bytes encoded per step. A segment ends
+            with the token that covers its last byte, so that token may run past it.
+        :param chunk_size: Number of input bytes each worker process encodes at a
+            time when ``workers`` is not 1.
+        :return: A generator of tokens. The other parameters are those of ``encode``.
+        """
+        if not 0 < window_size <= cls.MAX_WINDOW_SIZE:
+            raise ValueError(
+                f"Window size must be between 1 and {cls.MAX_WINDOW_SIZE} bytes."
+            )
+        if segment_size < 1:
+            raise ValueError("Segment size must be positive.")
+        if token_model not in cls.TOKEN_MODELS:
+            raise ValueError(f"Unknown token model: {token_model!r}.")
+        if strategy not in cls.STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy!r}.")
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be positive.")
+        if long_window_size is not None and not (
+            0 < long_window_size <= cls.MAX_LONG_WINDOW_SIZE
+        ):
+            raise ValueError(
+                "Long window size must be between 1 and "
+                f"{cls.MAX_LONG_WINDOW_SIZE} bytes."
+            )
+        # The long range index hashes slices, which needs immutable bytes
+        if not isinstance(data, (bytes, bytearray)) or (
+            long_window_size is not None and isinstance(data, bytearray)
+        ):
+            data = bytes(data)
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers > 1 and len(data) > chunk_size:
+            if not isinstance(match_finder, str):
+                raise ValueError(
+                    "Parallel encoding needs a match finder name, "
+                    "a match finder can't be shared between processes."
+                )
+            parameters = {
+                "match_finder": match_finder,
+                "strategy": strategy,
+                "window_size": window_size,
+                "max_chain": max_chain,
+                "nice_length": nice_length,
+                "max_lazy": max_lazy,
+                "good_length": good_length,
+                "iterations": iterations,
+                "acceleration": acceleration,
+                "token_model": token_model,
+                "segment_size": segment_size,
+                "long_window_size": long_window_size,
+            }
+            tokens = cls._iter_chunks(data, dictionary, workers, chunk_size, parameters)
+            if statistics is not None:
+                tokens = statistics.observe_tokens(tokens)
+            return tokens
+
+        # The dictionary becomes the start of the buffer, the data is encoded after it
+        start = 0
+        if dictionary:
+            dictionary = bytes(dictionary[-window_size:])
+            data = dictionary + data
+            start = len(dictionary)
+        # Dictionary positions up to here have their whole lookahead inside the
+        # dictionary and come indexed from the cache, the rest is indexed per call
+        indexed_end = max(0, start - cls.MAX_MATCH_LENGTH)
+        # Run searches compare the buffer with views of itself. The views of the
+        # buffer are released at the end, so a bytearray can be resized again
+        view = memoryview(data)
+        releases = [view.release]
 
-            # Use partial KMP to find the longest match
-            match_index, match_length = cls._partial_kmp_search(
-                search_window, lookahead_buffer, min_match_length=min_match_length
+        # A triple also covers the byte after its match, DEFLATE caps a match at 258
+        trailing_literal = token_model == "triple"
+        lookahead_size = cls.MAX_MATCH_LENGTH - trailing_literal
+        min_match_length = 3
+        if strategy == "fast":
+            indexed = cls._indexed_fast_table(dictionary if start else b"")
+            if fast_table is None:
+                table = indexed[:]
+            else:
+                # A table reused from an earlier call is overwritten in place
+                table = fast_table
+                table[:] = indexed
+            cls._index_fast_table(table, data, indexed_end, start)
+            index_positions = partial(cls._index_fast_table, table, data)
+            encode_segment = partial(
+                cls._encode_fast,
+                data,
+                table,
+                window_size,
+                lookahead_size,
+                trailing_literal,
+                acceleration,
+            )
+        elif strategy == "rle":
+            index_positions = None
+            encode_segment = partial(
+                cls._encode_rle, data, view, lookahead_size, trailing_literal
             )
+        else:
+            if isinstance(match_finder, str):
+                finder = cls.create_match_finder(
+                    match_finder, window_size, min_match_length, max_chain, nice_length
+                )
+            else:
+                # A finder reused from an earlier call keeps its tables
+                finder = match_finder
+                if not start:
+                    finder.reset()
+            if hasattr(finder, "release"):
+                releases.append(finder.release)
+            index_positions = partial(cls._index_match_finder, finder, data)
+            if start:
+                finder.restore(cls._indexed_dictionary(dictionary, finder))
+                index_positions(indexed_end, start)
+            if statistics is not None:
+                finder = statistics.wrap(finder)
+            if strategy == "greedy":
+                encode_segment = partial(
+                    cls._encode_greedy,
+                    data,
+                    view,
+                    finder,
+                    lookahead_size,
+                    trailing_literal,
+                )
+            elif strategy == "lazy":
+                encode_segment = partial(
+                    cls._encode_lazy,
+                    data,
+                    view,
+                    finder,
+                    lookahead_size,
+                    trailing_literal,
+                    max_lazy,
+                    good_length,
+                )
+            else:
+                parser = OptimalParser(
+                    finder,
+                    lookahead_size,
+                    iterations=iterations,
+                    trailing_literal=trailing_literal,
+                )
+                encode_segment = partial(cls._encode_optimal, data, parser)
+
+        if long_window_size is not None:
+            encode_segment = partial(
+                cls._encode_long_range,
+                data,
+                LongRangeMatchFinder(long_window_size),
+                encode_segment,
+                index_positions,
+                window_size,
+                lookahead_size,
+                trailing_literal,
+            )
+        tokens = cls._iter_segments(
+            start, len(data), encode_segment, segment_size, releases
+        )
+        if statistics is not None:
+            tokens = statistics.observe_tokens(tokens)
+        return tokens
+
+    @classmethod
+    def _iter_chunks(cls, data, dictionary, workers, chunk_size, parameters):
+        """
+        Encode the chunks of data in a pool of ``workers`` processes and yield their
+        tokens in order. Each chunk is primed with the window before it as its
+        dictionary, the first one with ``dictionary``. At most two chunks per worker
+        are in flight, so the pending tokens stay bounded.
+        """
+        window_size = parameters["window_size"]
+        with ProcessPoolExecutor(workers) as executor:
+            pending = deque()
+            for chunk_start in range(0, len(data), chunk_size):
+                chunk_dictionary = dictionary
+                if chunk_start:
+                    chunk_dictionary = data[
+                        max(0, chunk_start - window_size) : chunk_start
+                    ]
+                pending.append(
+                    executor.submit(
+                        cls._encode_chunk,
+                        data[chunk_start : chunk_start + chunk_size],
+                        chunk_dictionary,
+                        parameters,
+                    )
+                )
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    @classmethod
+    def _encode_chunk(cls, chunk, dictionary, parameters):
+        """Encode one chunk in a worker process, see ``_iter_chunks``."""
+        return TokenArray(cls.iter_encode(chunk, dictionary=dictionary, **parameters))
+
+    @classmethod
+    def _indexed_dictionary(cls, dictionary, finder):
+        """
+        Index of the dictionary for finders configured like ``finder``, for
+        ``finder.restore``.
+        """
+        return cls._indexed_match_finder(
+            dictionary,
+            type(finder),
+            finder.window_size,
+            finder.min_match_length,
+            finder.max_chain,
+            finder.nice_length,
+        )
+
+    @classmethod
+    @lru_cache(maxsize=DICTIONARY_CACHE_SIZE)
+    def _indexed_match_finder(
+        cls,
+        dictionary,
+        finder_type,
+        window_size,
+        min_match_length,
+        max_chain,
+        nice_length,
+    ):
+        """
+        Create a match finder with the dictionary positions indexed whose lookahead
+        lies inside the dictionary. The result is cached and only read from.
+        """
+        finder = finder_type(
+            window_size=window_size,
+            max_chain=max_chain,
+            nice_length=nice_length,
+            min_match_length=min_match_length,
+        )
+        for pos in range(len(dictionary) - cls.MAX_MATCH_LENGTH):
+            finder.skip(dictionary, pos)
+        return finder
+
+    @classmethod
+    @lru_cache(maxsize=DICTIONARY_CACHE_SIZE)
+    def _indexed_fast_table(cls, dictionary):
+        """
+        Fast strategy hash table with the same dictionary positions indexed as
+        ``_indexed_match_finder``, empty for an empty dictionary. The result is
+        cached and only read from.
+        """
+        table = cls.create_fast_table()
+        cls._index_fast_table(
+            table, dictionary, 0, len(dictionary) - cls.MAX_MATCH_LENGTH
+        )
+        return table
+
+    @classmethod
+    def _index_fast_table(cls, table, data, start, end):
+        """Insert the positions in ``[start, end)`` into a fast strategy hash table."""
+        hash_mask = len(table) - 1
+        for pos in range(start, min(end, len(data) - 2)):
+            h = ((data[pos] << 10) ^ (data[pos + 1] << 5) ^ data[pos + 2]) & hash_mask
+            table[h] = pos
+
+    @classmethod
+    def _index_match_finder(cls, finder, data, start, end):
+        """Insert the positions in ``[start, end)`` into a match finder."""
+        for pos in range(start, end):
+            finder.skip(data, pos)
 
-            if match_length > 0 and len(lookahead_buffer) >= min_match_length:
+    @classmethod
+    def _encode_long_range(
+        cls,
+        data,
+        long_finder,
+        encode_segment,
+        index_positions,
+        window_size,
+        lookahead_size,
+        trailing_literal,
+        start,
+        end,
+    ):
+        """
+        Encode ``[start, end)`` with the long matches of ``long_finder``, and the
+        bytes between them with ``encode_segment``. A long match is emitted as a run
+        of maximal tokens with the same distance; its last ``window_size`` positions
+        are indexed with ``index_positions``, so the regular encoder can match them.
+        """
+        pos = start
+        min_length = 3 + trailing_literal
+        while pos < end:
+            match = long_finder.find_next_match(data, pos, end)
+            if match is None:
+                break
+            match_pos, distance, length = match
+            if pos < match_pos:
+                pos = yield from encode_segment(pos, match_pos)
+
+            # The last token before the match may have run into it, and a remainder
+            # too short for a match is left to the regular encoder
+            match_end = match_pos + length
+            match_start = pos
+            while match_end - pos >= min_length:
+                token, pos = cls._match_token(
+                    data,
+                    distance,
+                    min(lookahead_size, match_end - pos - trailing_literal),
+                    pos,
+                    trailing_literal,
+                )
+                yield token
+            if index_positions is not None and pos > match_start:
+                index_positions(max(match_start, pos - window_size), pos)
+
+        if pos < end:
+            pos = yield from encode_segment(pos, end)
+        return pos
+
+    @classmethod
+    def _iter_segments(cls, start, n, encode_segment, segment_size, releases=()):
+        """
+        Run ``encode_segment(start, end)`` over consecutive segments from ``start``.
+        Each call yields the tokens of one segment and returns the position its last
+        token ends at. The ``releases`` callables are called once the segments are
+        done, or the generator is closed.
+        """
+        pos = start
+        try:
+            while pos < n:
+                pos = yield from encode_segment(pos, min(pos + segment_size, n))
+        finally:
+            for release in releases:
+                release()
+
+    @classmethod
+    def _encode_greedy(
+        cls, data, view, finder, lookahead_size, trailing_literal, start, end
+    ):
+        i = start
+        n = len(data)
+        distance = 0
+
+        while i < end:
+            max_length = min(lookahead_size, n - i)
+            if cls._may_continue_run(data, i, distance):
+                distance, match_length = cls._find_run(data, view, i, max_length)
+                if match_length == max_length:
+                    # Take maximal runs directly, without searching or indexing them
+                    token, i = cls._match_token(
+                        data, distance, match_length, i, trailing_literal
+                    )
+                    yield token
+                    continue
+
+            # Find the longest match for the lookahead buffer in the search window
+            distance, match_length = finder.find_longest_match(data, i, max_length)
+
+            if match_length > 0:
                 # Match found
-                distance = len(search_window) - match_index
-                next_character = (
-                    data[i + match_length] if i + match_length < n else None
+                token, next_i = cls._match_token(
+                    data, distance, match_length, i, trailing_literal
                 )
-                tokens.append((distance, match_length, next_character))
-                i += match_length + 1  # Move past the matched string and next character
+                yield token
+                # Index the matched string and next character
+                for j in range(i + 1, min(next_i, n)):
+                    finder.skip(data, j)
+                i = next_i  # Move past the matched string and next character
             else:
                 # No match found
-                tokens.append((0, 0, data[i]))
+                yield (0, 0, data[i])
                 i += 1  # Move one character ahead
 
-        return tokens
+        return i
+
+    @classmethod
+    def _match_token(cls, data, distance, length, pos, trailing_literal):
+        """
+        Build the token for a match at ``pos``. With a trailing literal the byte after
+        the match, if any, becomes the token's next character.
+
+        :return: A tuple (token, position after the token).
+        """
+        match_end = pos + length
+        if trailing_literal and match_end < len(data):
+            return (distance, length, data[match_end]), match_end + 1
+        return (distance, length, None), match_end
+
+    @classmethod
+    def _may_continue_run(cls, data, pos, previous_distance):
+        """
+        Cheap test for whether a run may start at ``pos``: the byte repeats the one
+        before it, or the previous match was itself a short-period run.
+        """
+        return pos > 0 and (
+            data[pos] == data[pos - 1] or 0 < previous_distance <= cls.RLE_MAX_PERIOD
+        )
+
+    @classmethod
+    def _find_run(cls, data, view, pos, max_length):
+        """
+        Find the longest run at ``pos`` that repeats the pattern of the previous 1 to
+        ``RLE_MAX_PERIOD`` bytes, comparing whole slices instead of single bytes.
+        ``view`` is a memoryview of ``data``, so the slices copy nothing.
+
+        :return: A tuple (distance, length), where the distance is the period, or
+            (0, 0) if no run of at least 3 bytes was found.
+        """
+        best_distance, best_length = 0, 0
+        if max_length < 3:
+            return best_distance, best_length
+
+        for period in range(1, min(cls.RLE_MAX_PERIOD, pos) + 1):
+            if data[pos] != data[pos - period]:
+                continue
+            # The lookahead repeats with this period where it equals itself shifted
+            # back by one period, so it is compared against a view one period back
+            source = pos - period
+
+            # Binary search the longest prefix of the lookahead that repeats
+            low, high = 1, max_length
+            while low < high:
+                middle = (low + high + 1) // 2
+                if data.startswith(view[source : source + middle], pos):
+                    low = middle
+                else:
+                    high = middle - 1
+
+            if low > best_length:
+                best_distance, best_length = period, low
+                if low == max_length:
+                    break
+
+        if best_length < 3:
+            return 0, 0
+        return best_distance, best_length
+
+    @classmethod
+    def _encode_rle(cls, data, view, lookahead_size, trailing_literal, start, end):
+        i = start
+        n = len(data)
+
+        while i < end:
+            distance, match_length = cls._find_run(
+                data, view, i, min(lookahead_size, n - i)
+            )
+            if match_length > 0:
+                token, i = cls._match_token(
+                    data, distance, match_length, i, trailing_literal
+                )
+                yield token
+            else:
+                yield (0, 0, data[i])
+                i += 1
+
+        return i
+
+    @classmethod
+    def _encode_fast(
+        cls,
+        data,
+        table,
+        window_size,
+        lookahead_size,
+        trailing_literal,
+        acceleration,
+        start,
+        end,
+    ):
+        i = start
+        n = len(data)
+        hash_mask = len(table) - 1
+        skip_trigger = cls.FAST_SKIP_TRIGGER
+        # The step between probes grows by one every 2**skip_trigger misses
+        misses = max(1, acceleration) << skip_trigger
+
+        while i < end and i + 3 <= n:
+            h = ((data[i] << 10) ^ (data[i + 1] << 5) ^ data[i + 2]) & hash_mask
+            candidate = table[h]
+            table[h] = i
+
+            if (
+                candidate >= 0
+                and i - candidate <= window_size
+                and data[candidate] == data[i]
+                and data[candidate + 1] == data[i + 1]
+                and data[candidate + 2] == data[i + 2]
+            ):
+                max_length = min(lookahead_size, n - i)
+                match_length = 3
+                while (
+                    match_length < max_length
+                    and data[candidate + match_length] == data[i + match_length]
+                ):
+                    match_length += 1
+
+                match_end = i + match_length
+                token, next_i = cls._match_token(
+                    data, i - candidate, match_length, i, trailing_literal
+                )
+                yield token
+                # Index the end of the match so the next repeat can continue from it
+                if match_end - 2 > i and match_end + 1 <= n:
+                    h = (
+                        (data[match_end - 2] << 10)
+                        ^ (data[match_end - 1] << 5)
+                        ^ data[match_end]
+                    ) & hash_mask
+                    table[h] = match_end - 2
+                i = next_i
+                misses = max(1, acceleration) << skip_trigger
+            else:
+                step = misses >> skip_trigger
+                misses += 1
+                next_i = min(i + step, n)
+                for j in range(i, next_i):
+                    yield (0, 0, data[j])
+                i = next_i
+
+        if i + 3 > n:
+            # Too few bytes are left to hash, emit them as literals
+            for byte in data[i:]:
+                yield (0, 0, byte)
+            i = n
+        return i
+
+    @classmethod
+    def _encode_lazy(
+        cls,
+        data,
+        view,
+        finder,
+        lookahead_size,
+        trailing_literal,
+        max_lazy,
+        good_length,
+        start,
+        end,
+    ):
+        i = start
+        n = len(data)
+        indexed = start  # Positions below this one are already in the finder's index
+        pending = None  # Match at i found while looking ahead from i - 1
+
+        distance = 0
+
+        # A pending match is already indexed, so it is taken even past the segment end
+        while i < end or pending is not None:
+            if pending is None:
+                max_length = min(lookahead_size, n - i)
+                if cls._may_continue_run(data, i, distance):
+                    distance, match_length = cls._find_run(data, view, i, max_length)
+                    if match_length == max_length:
+                        # Take maximal runs directly, without searching or indexing them
+                        token, i = cls._match_token(
+                            data, distance, match_length, i, trailing_literal
+                        )
+                        yield token
+                        indexed = i
+                        continue
+
+                distance, match_length = finder.find_longest_match(data, i, max_length)
+                indexed = i + 1
+            else:
+                distance, match_length = pending
+                pending = None
+
+            if 0 < match_length < max_lazy and i + 1 < n:
+                # Check whether deferring by one byte gives a longer match
+                max_chain = None
+                if match_length >= good_length and finder.max_chain is not None:
+                    max_chain = finder.max_chain >> 2
+                next_match = finder.find_longest_match(
+                    data, i + 1, min(lookahead_size, n - i - 1), max_chain=max_chain
+                )
+                indexed = i + 2
+                if next_match[1] > match_length:
+                    yield (0, 0, data[i])
+                    pending = next_match
+                    i += 1
+                    continue
+
+            if match_length > 0:
+                token, next_i = cls._match_token(
+                    data, distance, match_length, i, trailing_literal
+                )
+                yield token
+            else:
+                yield (0, 0, data[i])
+                next_i = i + 1
+
+            # Index the matched string and next character
+            for j in range(indexed, min(next_i, n)):
+                finder.skip(data, j)
+            indexed = max(indexed, next_i)
+            i = next_i
+
+        return i
 
     @classmethod
-    def decode(cls, tokens):
-        data = b""
+    def _encode_optimal(cls, data, parser, start, end):
+        yield from parser.parse(data, start, end)
+        return end
+
+    @classmethod
+    def decode(cls, tokens, dictionary=None):
+        """
+        Decode (distance, length, next_character) tokens back into data.
+
+        The output grows in a bytearray. A match is copied with one slice, or, if it
+        overlaps the bytes it produces (distance < length), by repeating its last
+        ``distance`` bytes.
+
+        :param tokens: The tokens, as a TokenArray or any iterable of tuples.
+        :param dictionary: The preset dictionary the tokens were encoded with.
+        :return: The decoded data.
+        """
+        no_character = None  # Marks a missing next character
+        if isinstance(tokens, TokenArray):
+            # Read the columns directly instead of building a tuple per token
+            no_character = TokenArray.NO_CHARACTER
+            tokens = zip(
+                tokens.distances, tokens.lengths, tokens.next_characters, strict=True
+            )
+
+        data = bytearray()
+        if dictionary:
+            data += dictionary[-cls.MAX_WINDOW_SIZE :]
+        dictionary_length = len(data)
+
         for distance, length, next_character in tokens:
             if length > 0:
                 start = len(data) - distance
-                for j in range(length):
-                    data += data[start + j].to_bytes(1, "big")
-            if next_character is not None:
-                data += next_character.to_bytes(1, "big")
+                if start < 0:
+                    raise ValueError("Match distance reaches before the data.")
+                if length <= distance:
+                    data += data[start : start + length]
+                else:
+                    pattern = data[start:]
+                    repeats, remainder = divmod(length, distance)
+                    data += pattern * repeats
+                    data += pattern[:remainder]
+            if next_character != no_character:
+                data.append(next_character)
 
-        return data
+        del data[:dictionary_length]
+        return bytes(data)
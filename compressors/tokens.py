@@ -0,0 +1,135 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only TokenArray.numpy_views needs it
+    np = None
+
+
+class TokenArray:
+    """
+    Compact container of LZ77 (distance, length, next_character) tokens.
+
+    The tokens are stored in three parallel typed arrays instead of a list of tuples,
+    which takes 8 bytes per token instead of a tuple and up to three int objects.
+    Distances take 32 bits, to hold those of long range matching.
+    A missing next character is stored as ``NO_CHARACTER``. Indexing and iteration
+    give back plain tuples, with None for a missing next character, so a TokenArray
+    can be used wherever a list of tokens is expected.
+    """
+
+    # Stored in place of a missing next character, outside the byte range
+    NO_CHARACTER = 256
+
+    def __init__(self, tokens=()):
+        """
+        :param tokens: Iterable of (distance, length, next_character) tokens to
+            start with.
+        """
+        self.distances = array("I")
+        self.lengths = array("H")
+        self.next_characters = array("H")
+        self.extend(tokens)
+
+    @classmethod
+    def _from_columns(cls, distances, lengths, next_characters):
+        tokens = cls()
+        tokens.distances = distances
+        tokens.lengths = lengths
+        tokens.next_characters = next_characters
+        return tokens
+
+    def append(self, token) -> None:
+        """Append one (distance, length, next_character) token."""
+        distance, length, next_character = token
+        self.distances.append(distance)
+        self.lengths.append(length)
+        self.next_characters.append(
+            self.NO_CHARACTER if next_character is None else next_character
+        )
+
+    def extend(self, tokens) -> None:
+        """Append every token of an iterable, such as LZ77Compressor.iter_encode."""
+        if isinstance(tokens, TokenArray):
+            self.distances.extend(tokens.distances)
+            self.lengths.extend(tokens.lengths)
+            self.next_characters.extend(tokens.next_characters)
+            return
+
+        append_distance = self.distances.append
+        append_length = self.lengths.append
+        append_next_character = self.next_characters.append
+        no_character = self.NO_CHARACTER
+        for distance, length, next_character in tokens:
+            append_distance(distance)
+            append_length(length)
+            append_next_character(
+                no_character if next_character is None else next_character
+            )
+
+    def clear(self) -> None:
+        """Remove all tokens, keeping the arrays for reuse."""
+        del self.distances[:]
+        del self.lengths[:]
+        del self.next_characters[:]
+
+    def numpy_views(self):
+        """
+        View the columns as NumPy arrays without copying them. The views share the
+        token memory, so they must not outlive changes to the TokenArray's length.
+
+        :return: A tuple (distances, lengths, next_characters) of a uint32 and two
+            uint16 arrays.
+        """
+        if np is None:
+            raise ValueError("NumPy is not installed.")
+        return (
+            np.frombuffer(self.distances, dtype=np.uint32),
+            np.frombuffer(self.lengths, dtype=np.uint16),
+            np.frombuffer(self.next_characters, dtype=np.uint16),
+        )
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __iter__(self):
+        no_character = self.NO_CHARACTER
+        for distance, length, next_character in zip(
+            self.distances, self.lengths, self.next_characters, strict=True
+        ):
+            yield (
+                distance,
+                length,
+                None if next_character == no_character else next_character,
+            )
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            # Slicing copies the typed arrays in C, which makes splitting into blocks cheap
+            return self._from_columns(
+                self.distances[index],
+                self.lengths[index],
+                self.next_characters[index],
+            )
+        next_character = self.next_characters[index]
+        return (
+            self.distances[index],
+            self.lengths[index],
+            None if next_character == self.NO_CHARACTER else next_character,
+        )
+
+    def __eq__(self, other):
+        if isinstance(other, TokenArray):
+            return (
+                self.distances == other.distances
+                and self.lengths == other.lengths
+                and self.next_characters == other.next_characters
+            )
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"TokenArray({list(self)!r})"
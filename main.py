@@ -14,12 +14,17 @@ from pathlib import Path
 from compressors import DeflateCompressor
 
 
-def compress_data(data: bytes) -> bytes:
+def compress_data(data: bytes, level: int = DeflateCompressor.DEFAULT_LEVEL) -> bytes:
     """Compress data using DEFLATE algorithm and return compressed bytes."""
-    return DeflateCompressor.compress(data)
+    return DeflateCompressor.compress(data, level)
 
 
-def compress_file(input_path: Path, output_path: Path | None = None) -> bytes:
+def compress_file(
+    input_path: Path,
+    output_path: Path | None = None,
+    level: int = DeflateCompressor.DEFAULT_LEVEL,
+    long_window_size: int | None = None,
+) -> bytes:
     """Compress a file using DEFLATE algorithm and return compressed bytes."""
     if not input_path.exists():
         print(f"Error: Input file '{input_path}' does not exist.", file=sys.stderr)
@@ -39,7 +44,9 @@ def compress_file(input_path: Path, output_path: Path | None = None) -> bytes:
         original_size = len(data)
         print(f"Original size: {original_size:,} bytes")
 
-        compressed_data = DeflateCompressor.compress(data)
+        compressed_data = DeflateCompressor.compress(
+            data, level, long_window_size=long_window_size
+        )
         compressed_size = len(compressed_data)
 
         elapsed_time = time.time() - start_time
@@ -165,6 +172,24 @@ def main():
         type=Path,
         help="Output compressed file (default: input + .deflate)",
     )
+    compress_parser.add_argument(
+        "-l",
+        "--level",
+        type=int,
+        choices=range(10),
+        default=DeflateCompressor.DEFAULT_LEVEL,
+        help="Compression level, 0 (store) to 9 (best) (default: %(default)s)",
+    )
+    compress_parser.add_argument(
+        "--long",
+        type=int,
+        nargs="?",
+        const=26,
+        choices=range(16, 27),
+        metavar="WINDOW_LOG",
+        help="Also match repeats up to 2**WINDOW_LOG bytes back, 16 to 26 "
+        "(default when given: %(const)s)",
+    )
 
     # Decompress command
     decompress_parser = subparsers.add_parser("decompress", help="Decompress a file")
@@ -191,7 +216,8 @@ def main():
 
     # Execute command
     if args.command == "compress":
-        compress_file(args.input, args.output)
+        long_window_size = None if args.long is None else 2**args.long
+        compress_file(args.input, args.output, args.level, long_window_size)
     elif args.command == "decompress":
         decompress_file(args.input, args.output)
     elif args.command == "test":
@@ -6,15 +6,34 @@ This test suite covers all compression algorithms and edge cases.
 """
 
 import os
+import random
 import unittest
 
 import pytest
 
-from compressors import DeflateCompressor
+from compressors import Compressor, Decompressor, DeflateCompressor
+from compressors.alphabets import DistanceAlphabet, SymbolLengthAlphabet
+from compressors.bits import BitReader, BitWriter
+from compressors.deflate import (
+    FIXED_LITERAL_LENGTH_BIT_LENGTHS,
+    FIXED_LITERAL_LENGTH_CODES,
+    binary_string_to_bytes,
+)
+from compressors.helpers.binary_tree import BinaryTreeMatchFinder
 from compressors.helpers.block_splitter import BlockSplitter
+from compressors.helpers.hash_chain import HashChainMatchFinder
+from compressors.helpers.optimal_parser import OptimalParser
+from compressors.helpers.rfind import RfindMatchFinder
+from compressors.helpers.statistics import MatchStatistics
+from compressors.helpers.suffix_array import (
+    SuffixArrayMatchFinder,
+    build_lcp_array,
+    build_suffix_array,
+)
 from compressors.huffman import HuffmanCompressor
 from compressors.integer import IntegerCompressor
 from compressors.lz77 import LZ77Compressor
+from compressors.tokens import TokenArray
 
 
 class TestIntegerCompressor(unittest.TestCase):
@@ -65,6 +84,53 @@ class TestHuffmanCompressor(unittest.TestCase):
         for symbol in frequencies:
             self.assertGreater(tree[symbol], 0)
 
+    def test_create_huffman_tree_code_lengths(self):
+        """Test that the code lengths are those of a Huffman tree."""
+        frequencies = {65: 1, 66: 1, 67: 2, 68: 4}
+        tree = HuffmanCompressor._create_huffman_tree(frequencies)
+        self.assertEqual(tree, {65: 3, 66: 3, 67: 2, 68: 1})
+
+        # Fibonacci frequencies give the deepest possible tree
+        fibonacci = [1, 1]
+        while len(fibonacci) < 20:
+            fibonacci.append(fibonacci[-1] + fibonacci[-2])
+        tree = HuffmanCompressor._create_huffman_tree(dict(enumerate(fibonacci)))
+        self.assertEqual(max(tree.values()), 19)
+        self.assertEqual(sum(2**-length for length in tree.values()), 1)
+
+    def test_create_codes_max_bits(self):
+        """Test that code lengths are limited without losing decodability."""
+        fibonacci = [1, 1]
+        while len(fibonacci) < 25:
+            fibonacci.append(fibonacci[-1] + fibonacci[-2])
+        data = [letter for letter, count in enumerate(fibonacci) for _ in range(count)]
+
+        unlimited, _ = HuffmanCompressor.create_codes(data, 25, max_bits=None)
+        self.assertEqual(max(unlimited), 24)
+        for max_bits in (5, 7, 15):
+            bit_lengths, codes = HuffmanCompressor.create_codes(data, 25, max_bits)
+            self.assertEqual(max(bit_lengths), max_bits)
+            self.assertEqual(sum(2**-length for length in bit_lengths), 1)
+            # The limited code is still a prefix code
+            table, root_bits = HuffmanCompressor.generate_decode_table(bit_lengths)
+            for letter, code in codes.items():
+                writer = BitWriter()
+                writer.write_bit_string(code + b"1")
+                reader = BitReader(writer.getvalue())
+                self.assertEqual(
+                    HuffmanCompressor.decode_symbol(reader, table, root_bits), letter
+                )
+                self.assertEqual(reader.position, len(code))
+
+    def test_package_merge_is_optimal(self):
+        """Test package-merge against a known optimal length-limited code."""
+        # Unlimited Huffman lengths would be 4, 4, 3, 2, 1
+        self.assertEqual(
+            HuffmanCompressor._package_merge([1, 1, 2, 4, 8], 3), [3, 3, 3, 3, 1]
+        )
+        with self.assertRaises(ValueError):
+            HuffmanCompressor._package_merge([1, 1, 1, 1, 1], 2)
+
     def test_generate_dynamic_huffman_codes(self):
         """Test generating Huffman codes from bit lengths."""
         bit_lengths = [2, 1, 3, 0, 3]
@@ -79,6 +145,19 @@ class TestHuffmanCompressor(unittest.TestCase):
             else:
                 self.assertNotIn(i, codes)
 
+    def test_generate_canonical_codes(self):
+        """Test integer codes against the bit string codes, and reversed codes."""
+        bit_lengths = [2, 1, 3, 0, 3]
+        codes = HuffmanCompressor.generate_canonical_codes(bit_lengths)
+        self.assertEqual(codes, [0b10, 0b0, 0b110, 0, 0b111])
+        bit_strings = HuffmanCompressor.generate_dynamic_huffman_codes(bit_lengths)
+        for symbol, bits in bit_strings.items():
+            self.assertEqual(int(bits, 2), codes[symbol])
+        self.assertEqual(
+            HuffmanCompressor.generate_canonical_codes(bit_lengths, reverse=True),
+            [0b01, 0b0, 0b011, 0, 0b111],
+        )
+
     def test_create_codes_round_trip(self):
         """Test creating codes and using them for encoding/decoding."""
         data = [65, 66, 65, 67, 65, 65, 66]
@@ -89,29 +168,290 @@ class TestHuffmanCompressor(unittest.TestCase):
             bit_lengths[65], bit_lengths[67]
         )  # 'A' appears more than 'C'
 
-    def test_decode_next_valid_code(self):
-        """Test decoding next symbol from valid data."""
+    def test_decode_symbol_valid_code(self):
+        """Test decoding the next symbol and leaving the following bits."""
         bit_lengths = [0, 2, 1, 3]
-        decode_table = HuffmanCompressor.generate_decode_table(bit_lengths)
-
-        # Find a valid code to test with
-        if decode_table:
-            code, symbol = next(iter(decode_table.items()))
-            data = code + b"extra"
-            result_symbol, remaining = HuffmanCompressor.decode_next(data, decode_table)
-            self.assertEqual(result_symbol, symbol)
-            self.assertEqual(remaining, b"extra")
+        table, root_bits = HuffmanCompressor.generate_decode_table(bit_lengths)
+        codes = HuffmanCompressor.generate_dynamic_huffman_codes(bit_lengths)
+        for symbol, code in codes.items():
+            writer = BitWriter()
+            writer.write_bit_string(code + b"0110")
+            reader = BitReader(writer.getvalue())
+            self.assertEqual(
+                HuffmanCompressor.decode_symbol(reader, table, root_bits), symbol
+            )
+            self.assertEqual(reader.read(4), 0b0110)
 
-    def test_decode_next_invalid_code(self):
+    def test_decode_symbol_invalid_code(self):
         """Test decoding with invalid code."""
-        decode_table = {b"01": 1, b"10": 2}
+        table, root_bits = HuffmanCompressor.generate_decode_table([0, 2, 2])
+        writer = BitWriter()
+        writer.write(0b11, 2)
         with self.assertRaises(ValueError):
-            HuffmanCompressor.decode_next(b"11", decode_table)
+            HuffmanCompressor.decode_symbol(
+                BitReader(writer.getvalue()), table, root_bits
+            )
+
+    def test_generate_decode_table_invalid_lengths(self):
+        """Test that impossible code lengths are rejected before building tables."""
+        with self.assertRaises(ValueError):
+            HuffmanCompressor.generate_decode_table([1, 1, 1])
+        with self.assertRaises(ValueError):
+            HuffmanCompressor.generate_decode_table([1, 40])
+        # Complete and incomplete codes are accepted
+        HuffmanCompressor.generate_decode_table([1, 2, 3, 3])
+        HuffmanCompressor.generate_decode_table([2, 15])
+
+    def test_decode_symbol_two_level_table(self):
+        """Test decoding symbols through the primary table and subtables."""
+        bit_lengths = [0, 2, 1, 4, 4, 4, 5, 5]
+        codes = HuffmanCompressor.generate_canonical_codes(bit_lengths)
+        symbols = [2, 1, 4, 3, 7, 2, 6, 5, 1]
+        writer = BitWriter()
+        for symbol in symbols:
+            writer.write(codes[symbol], bit_lengths[symbol])
+        for root_bits in (1, 2, 3, None):
+            table, bits = HuffmanCompressor.generate_decode_table(
+                bit_lengths, root_bits
+            )
+            self.assertEqual(bits, 5 if root_bits is None else root_bits)
+            self.assertEqual(len(table), 2**bits)
+            reader = BitReader(writer.getvalue())
+            decoded = [
+                HuffmanCompressor.decode_symbol(reader, table, bits) for _ in symbols
+            ]
+            self.assertEqual(decoded, symbols)
+            self.assertEqual(len(reader), 0)
+
+        # An incomplete code leaves bit patterns that start no code
+        table, max_bits = HuffmanCompressor.generate_decode_table([1, 2])
+        writer = BitWriter()
+        writer.write(0b11, 2)
+        with self.assertRaises(ValueError):
+            HuffmanCompressor.decode_symbol(
+                BitReader(writer.getvalue()), table, max_bits
+            )
+
+
+class TestBitWriter(unittest.TestCase):
+    """Test cases for the BitWriter."""
+
+    def test_matches_bit_strings(self):
+        """Test that packed codes give the bytes of the equivalent bit string."""
+        rng = random.Random(0)
+        writers = [BitWriter(), BitWriter()]
+        bit_strings = [b"", b""]
+        for i in range(500):
+            length = rng.randrange(1, 20)
+            value = rng.getrandbits(length)
+            writers[i % 2].write(value, length)
+            bit_strings[i % 2] += f"{value:0{length}b}".encode()
+        writer, other = writers
+        writer.write_bit_string(b"0110")
+        other.write_bit_string(b"")
+        writer.extend(other)
+        bits = bit_strings[0] + b"0110" + bit_strings[1]
+        self.assertEqual(len(writer), len(bits))
+        self.assertEqual(writer.getvalue(), binary_string_to_bytes(bits))
+        self.assertEqual(BitWriter().getvalue(), binary_string_to_bytes(b""))
+
+    def test_bit_reader_round_trip(self):
+        """Test that a BitReader reads back the codes of a BitWriter."""
+        rng = random.Random(1)
+        codes = [(rng.getrandbits(length), length) for length in range(0, 70)] * 3
+        writer = BitWriter()
+        for value, length in codes:
+            writer.write(value, length)
+        reader = BitReader(writer.getvalue())
+        self.assertEqual(len(reader), len(writer))
+        for value, length in codes:
+            self.assertEqual(reader.peek(length), value)
+            self.assertEqual(reader.read(length), value)
+        self.assertEqual(len(reader), 0)
+
+        # Bits past the end read as zeros
+        self.assertEqual(reader.read(5), 0)
+        self.assertEqual(len(reader), 0)
+        self.assertEqual(reader.position, reader.length + 5)
 
 
 class TestLZ77Compressor(unittest.TestCase):
     """Test the LZ77 compression algorithm."""
 
+    def test_encode_unknown_match_finder(self):
+        """Test that an unknown match finder is rejected."""
+        with self.assertRaises(ValueError):
+            LZ77Compressor.encode(b"abc", match_finder="nope")
+
+    def test_encode_unknown_strategy(self):
+        """Test that an unknown strategy is rejected."""
+        with self.assertRaises(ValueError):
+            LZ77Compressor.encode(b"abc", strategy="nope")
+
+    def test_encode_unknown_token_model(self):
+        """Test that an unknown token model is rejected."""
+        with self.assertRaises(ValueError):
+            LZ77Compressor.encode(b"abc", token_model="nope")
+
+    def test_deflate_token_model(self):
+        """Test that DEFLATE tokens separate matches from literals."""
+        data = b"abcdef" + b"abc" + b"def" * 3
+        tokens = LZ77Compressor.encode(data, token_model="deflate")
+        self.assertEqual(tokens[-2:], [(6, 6, None), (3, 6, None)])
+        self.assertTrue(all(length == 0 for _, length, _ in tokens[:6]))
+
+        tokens = LZ77Compressor.encode(b"a" * 1000, token_model="deflate")
+        self.assertEqual(tokens[:3], [(0, 0, 97), (1, 258, None), (1, 258, None)])
+        self.assertEqual(LZ77Compressor.decode(tokens), b"a" * 1000)
+
+    def test_lazy_defers_to_longer_match(self):
+        """Test that lazy matching emits a literal to take a longer match next."""
+        data = b"abcXbcdeYabcde"
+        greedy = LZ77Compressor.encode(data, strategy="greedy")
+        lazy = LZ77Compressor.encode(data, strategy="lazy")
+        self.assertEqual(greedy[-2:], [(9, 3, ord("d")), (0, 0, ord("e"))])
+        self.assertEqual(lazy[-2:], [(0, 0, ord("a")), (6, 4, None)])
+
+    def test_lazy_with_unbounded_finder(self):
+        """Test lazy matching with a finder that has no max_chain, like rfind."""
+        words = [
+            bytes(97 + (7 * i + 11 * j * j) % 26 for j in range(10)) for i in range(20)
+        ]
+        data = b" ".join(words[i * i % 20] for i in range(200))
+        tokens = LZ77Compressor.encode(data, match_finder="rfind", strategy="lazy")
+        # Matches of a word and a space reach good_length, but not max_lazy
+        self.assertTrue(any(8 <= token[1] < 16 for token in tokens))
+        self.assertEqual(LZ77Compressor.decode(tokens), data)
+
+    def test_encode_matches_across_full_window(self):
+        """Test that repeats up to 32 KiB apart are found."""
+        import random
+
+        random.seed(11)
+        chunk = bytes(random.randint(0, 255) for _ in range(20000))
+        tokens = LZ77Compressor.encode(chunk + chunk)
+        self.assertIn(20000, {distance for distance, _, _ in tokens})
+        self.assertEqual(LZ77Compressor.decode(tokens), chunk + chunk)
+
+    def test_encode_memoryview(self):
+        """Test that any bytes-like input is accepted."""
+        data = b"abcabcabc" + b"x" * 20 + b"abcabc"
+        for strategy in LZ77Compressor.STRATEGIES:
+            tokens = LZ77Compressor.encode(memoryview(data), strategy=strategy)
+            self.assertEqual(tokens, LZ77Compressor.encode(data, strategy=strategy))
+
+    def test_encode_with_dictionary(self):
+        """Test that matches reach into the dictionary and decode needs it."""
+        dictionary = b"0123456789" * 100 + b"hello world"
+        for strategy in LZ77Compressor.STRATEGIES:
+            tokens = LZ77Compressor.encode(
+                b"hello world!", strategy=strategy, dictionary=dictionary
+            )
+            self.assertEqual(
+                LZ77Compressor.decode(tokens, dictionary=dictionary), b"hello world!"
+            )
+            if strategy != "rle":
+                self.assertEqual(tokens[0], (11, 11, ord("!")))
+
+    def test_iter_encode_parallel_chunks(self):
+        """Test that chunks encoded in parallel match across chunk boundaries."""
+        data = os.urandom(3000) * 4
+        for token_model in LZ77Compressor.TOKEN_MODELS:
+            tokens = list(
+                LZ77Compressor.iter_encode(
+                    data, token_model=token_model, workers=2, chunk_size=4000
+                )
+            )
+            self.assertEqual(LZ77Compressor.decode(tokens), data)
+            # Only the first 3000 bytes are literals, the rest are long matches
+            self.assertLess(len(tokens), 3100)
+
+    def test_iter_encode_parallel_needs_match_finder_name(self):
+        """Test that a match finder instance can't be shared between processes."""
+        finder = LZ77Compressor.create_match_finder("hash_chain")
+        with self.assertRaises(ValueError):
+            LZ77Compressor.iter_encode(
+                b"abc" * 100, match_finder=finder, workers=2, chunk_size=100
+            )
+
+    def test_long_window_matches_beyond_window(self):
+        """Test that long range mode matches repeats beyond the DEFLATE window."""
+        blob = os.urandom(1000)
+        data = blob + b"\x00" * 40000 + blob
+        for token_model in LZ77Compressor.TOKEN_MODELS:
+            tokens = LZ77Compressor.encode(
+                data, token_model=token_model, long_window_size=2**16
+            )
+            self.assertEqual(LZ77Compressor.decode(tokens), data)
+            self.assertIn(41000, tokens.distances)
+            self.assertNotIn(
+                41000, LZ77Compressor.encode(data, token_model=token_model).distances
+            )
+        with self.assertRaises(ValueError):
+            LZ77Compressor.encode(data, long_window_size=2**27)
+
+    def test_encode_invalid_window_size(self):
+        """Test that windows beyond the DEFLATE distance limit are rejected."""
+        with self.assertRaises(ValueError):
+            LZ77Compressor.encode(b"abc", window_size=2**16)
+
+    def test_fast_strategy_finds_repeats_after_incompressible_data(self):
+        """Test that the fast strategy still matches once skipping has sped up."""
+        import random
+
+        random.seed(5)
+        noise = bytes(random.randint(0, 255) for _ in range(5000))
+        text = b"The quick brown fox jumps over the lazy dog. " * 40
+        data = noise + text
+        tokens = LZ77Compressor.encode(data, strategy="fast", acceleration=2)
+        self.assertEqual(LZ77Compressor.decode(tokens), data)
+        self.assertLess(len(tokens), len(noise) + len(text) // 10)
+
+    def test_find_run_short_periods(self):
+        """Test that runs of a byte and of short repeating patterns are detected."""
+        data = b"x" + b"\x00" * 300 + b"abcabcabcabc" + b"zz"
+        view = memoryview(data)
+        self.assertEqual(LZ77Compressor._find_run(data, view, 2, 257), (1, 257))
+        self.assertEqual(LZ77Compressor._find_run(data, view, 304, 10), (3, 9))
+        self.assertEqual(LZ77Compressor._find_run(data, view, 1, 10), (0, 0))
+
+    def test_encode_releases_bytearray(self):
+        """Test that a bytearray can be resized once its tokens are consumed."""
+        data = bytearray(b"abcabcabc" * 20 + b"\x00" * 50)
+        for strategy in LZ77Compressor.STRATEGIES:
+            tokens = list(LZ77Compressor.iter_encode(data, strategy=strategy))
+            self.assertEqual(LZ77Compressor.decode(tokens), data)
+            data.extend(b"xyz")
+
+    def test_rle_strategy_emits_maximal_runs(self):
+        """Test that the rle strategy covers long runs with maximal matches."""
+        data = b"\x00" * 1000 + b"ab" * 300
+        tokens = LZ77Compressor.encode(data, strategy="rle")
+        self.assertEqual(LZ77Compressor.decode(tokens), data)
+        self.assertEqual(tokens[1], (1, 257, 0))
+        self.assertLess(len(tokens), 12)
+
+    def test_decode_overlapping_matches(self):
+        """Test that matches longer than their distance repeat the last bytes."""
+        tokens = [(0, 0, 97), (0, 0, 98), (0, 0, 99), (3, 10, 100), (2, 5, None)]
+        expected = b"abc" + b"abcabcabca" + b"d" + b"adada"
+        self.assertEqual(LZ77Compressor.decode(tokens), expected)
+        self.assertEqual(LZ77Compressor.decode(TokenArray(tokens)), expected)
+
+    def test_partial_kmp_search_in_place(self):
+        """Test that searching by offset agrees with searching copied slices."""
+        data = b"xxabcdabcyyabcdabcdzz"
+        self.assertEqual(
+            LZ77Compressor._partial_kmp_search(
+                data, data, start=2, end=11, pattern_start=11, pattern_end=19
+            ),
+            LZ77Compressor._partial_kmp_search(data[:11], data[11:19]),
+        )
+        self.assertEqual(
+            LZ77Compressor._kmp_preprocess_pattern(data, 11, 19),
+            LZ77Compressor._kmp_preprocess_pattern(data[11:19]),
+        )
+
     def test_kmp_preprocessing(self):
         """Test KMP preprocessing algorithm."""
         pattern = b"abcabcab"
@@ -137,6 +477,314 @@ def test_lz77_compressor_encode_decode_round_trip(data, description):
     assert decoded == data
 
 
+@pytest.mark.parametrize(
+    "match_finder", ["kmp", "hash_chain", "binary_tree", "suffix_array", "rfind"]
+)
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"abcabcabc",
+        b"a" * 1000,
+        b"The quick brown fox jumps over the lazy dog. " * 50,
+        bytes(range(256)) * 4,
+    ],
+)
+def test_lz77_compressor_match_finders_round_trip(data, match_finder):
+    """Test that every match finder produces tokens that decode to the input."""
+    tokens = LZ77Compressor.encode(data, match_finder=match_finder)
+    assert LZ77Compressor.decode(tokens) == data
+
+
+@pytest.mark.parametrize("token_model", LZ77Compressor.TOKEN_MODELS)
+@pytest.mark.parametrize("match_finder", ["hash_chain", "binary_tree", "rfind"])
+@pytest.mark.parametrize("strategy", LZ77Compressor.STRATEGIES)
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"ab",
+        b"a" * 1000,
+        b"The quick brown fox jumps over the lazy dog. " * 50,
+        bytes(range(256)) * 4,
+    ],
+)
+def test_lz77_compressor_strategies_round_trip(
+    data, strategy, match_finder, token_model
+):
+    """Test that every parsing strategy produces tokens that decode to the input."""
+    tokens = LZ77Compressor.encode(
+        data, match_finder=match_finder, strategy=strategy, token_model=token_model
+    )
+    assert LZ77Compressor.decode(tokens) == data
+
+
+@pytest.mark.parametrize("strategy", LZ77Compressor.STRATEGIES)
+@pytest.mark.parametrize("segment_size", [1, 100, 4096])
+def test_lz77_compressor_iter_encode_round_trip(segment_size, strategy):
+    """Test that tokens streamed segment by segment decode to the input."""
+    data = b"The quick brown fox jumps over the lazy dog. " * 50 + b"a" * 1000
+    tokens = list(
+        LZ77Compressor.iter_encode(data, strategy=strategy, segment_size=segment_size)
+    )
+    assert LZ77Compressor.decode(tokens) == data
+    # Only the token at the very end of the data may lack a next character
+    assert all(token[2] is not None for token in tokens[:-1])
+
+
+class TestHashChainMatchFinder(unittest.TestCase):
+    """Test the hash-chain match finder."""
+
+    def test_finds_closest_longest_match(self):
+        """Test that the closest of the longest matches is returned."""
+        data = b"abcdXabcdYabcdZ"
+        finder = HashChainMatchFinder(window_size=64)
+        for pos in range(10):
+            finder.skip(data, pos)
+        self.assertEqual(finder.find_longest_match(data, 10, 5), (5, 4))
+
+    def test_no_match_outside_window(self):
+        """Test that positions beyond the window are not matched."""
+        data = b"abcd" + b"x" * 20 + b"abcd"
+        finder = HashChainMatchFinder(window_size=16)
+        for pos in range(24):
+            finder.skip(data, pos)
+        self.assertEqual(finder.find_longest_match(data, 24, 4), (0, 0))
+
+    def test_max_chain_bounds_search(self):
+        """Test that the chain depth limits how far back candidates are probed."""
+        data = b"abcd" + b"abcX" * 8 + b"abcd"
+        finder = HashChainMatchFinder(window_size=64, max_chain=2)
+        for pos in range(36):
+            finder.skip(data, pos)
+        self.assertEqual(finder.find_longest_match(data, 36, 4), (4, 3))
+
+    def test_invalid_window_size(self):
+        """Test that non power of two windows are rejected."""
+        with self.assertRaises(ValueError):
+            HashChainMatchFinder(window_size=1000)
+
+    def test_candidate_at_window_edge_probed_once(self):
+        """Test that a candidate exactly one window back ends the chain."""
+        data = b"abcX" + bytes(range(100, 160)) + b"abcYabc"
+        finder = HashChainMatchFinder(window_size=64, max_chain=32)
+        for pos in range(64):
+            finder.skip(data, pos)
+        self.assertEqual(finder.find_longest_match(data, 64, 7), (64, 3))
+        self.assertEqual(finder.probes, 1)
+
+
+class TestBinaryTreeMatchFinder(unittest.TestCase):
+    """Test the binary-tree match finder."""
+
+    def test_find_matches_increasing_length(self):
+        """Test that all candidate matches are returned by increasing length."""
+        data = b"abcdefXabcdYabcZabcdefg"
+        finder = BinaryTreeMatchFinder(window_size=64)
+        for pos in range(16):
+            finder.skip(data, pos)
+        matches = finder.find_matches(data, 16, 7)
+        self.assertEqual(matches, [(4, 3), (9, 4), (16, 6)])
+
+    def test_find_longest_match_agrees_with_exhaustive_search(self):
+        """Test that the tree finds the same longest match lengths as a full scan."""
+        import random
+
+        random.seed(7)
+        data = bytes(random.choice(b"ab") for _ in range(2000))
+        window_size = 128
+        finder = BinaryTreeMatchFinder(window_size=window_size, max_chain=2**20)
+        for pos in range(len(data)):
+            max_length = min(258, len(data) - pos)
+            _, length = finder.find_longest_match(data, pos, max_length)
+
+            expected = 0
+            for candidate in range(max(0, pos - window_size + 1), pos):
+                match_length = 0
+                while (
+                    match_length < max_length
+                    and data[candidate + match_length] == data[pos + match_length]
+                ):
+                    match_length += 1
+                expected = max(expected, match_length)
+            self.assertEqual(length, expected if expected >= 3 else 0)
+
+
+class TestSuffixArrayMatchFinder(unittest.TestCase):
+    """Test the suffix-array match finder."""
+
+    def test_build_suffix_array(self):
+        """Test that suffixes are sorted and the LCP array matches them."""
+        data = b"mississippi$banana"
+        suffix_array, rank = build_suffix_array(data, use_numpy=False)
+        self.assertEqual(
+            list(suffix_array), sorted(range(len(data)), key=lambda i: data[i:])
+        )
+        # The index takes 4 bytes per input byte and array
+        self.assertEqual((suffix_array.typecode, rank.typecode), ("i", "i"))
+        for r, i in enumerate(suffix_array):
+            self.assertEqual(rank[i], r)
+
+        lcp = build_lcp_array(data, suffix_array, rank)
+        self.assertEqual(lcp[0], 0)
+        for r in range(1, len(data)):
+            first, second = data[suffix_array[r - 1] :], data[suffix_array[r] :]
+            common = 0
+            while common < min(len(first), len(second)) and (
+                first[common] == second[common]
+            ):
+                common += 1
+            self.assertEqual(lcp[r], common)
+
+    def test_build_suffix_array_numpy(self):
+        """Test that the NumPy build agrees with the pure Python build."""
+        pytest.importorskip("numpy")
+        data = b"abracadabra" * 20
+        self.assertEqual(
+            build_suffix_array(data, use_numpy=True),
+            build_suffix_array(data, use_numpy=False),
+        )
+
+    def test_match_respects_window(self):
+        """Test that only previous positions inside the window are matched."""
+        data = b"abcdef" + b"x" * 20 + b"abcdef" + b"abcd"
+        finder = SuffixArrayMatchFinder(window_size=16)
+        self.assertEqual(finder.find_longest_match(data, 26, 6), (0, 0))
+        self.assertEqual(finder.find_longest_match(data, 32, 4), (6, 4))
+
+
+class TestRfindMatchFinder(unittest.TestCase):
+    """Test the rfind-based match finder."""
+
+    def test_longest_match_is_closest(self):
+        """Test that the longest match wins and ties go to the closest occurrence."""
+        data = b"abcdexyzabcdefgh" + b"abcx" + b"abcdefgh"
+        finder = RfindMatchFinder()
+        self.assertEqual(finder.find_longest_match(data, 20, 8), (12, 8))
+        self.assertEqual(finder.find_longest_match(data, 16, 4), (8, 3))
+
+    def test_overlapping_match(self):
+        """Test that a match may run into the bytes it is matching."""
+        data = b"ab" * 50
+        self.assertEqual(RfindMatchFinder().find_longest_match(data, 2, 98), (2, 98))
+
+    def test_match_respects_window(self):
+        """Test that only previous positions inside the window are matched."""
+        data = b"abcdef" + b"x" * 20 + b"abcdef" + b"abcd"
+        finder = RfindMatchFinder(window_size=16)
+        self.assertEqual(finder.find_longest_match(data, 26, 6), (0, 0))
+        self.assertEqual(finder.find_longest_match(data, 32, 4), (6, 4))
+
+    def test_reused_finder_releases_bytearray(self):
+        """Test that a reused finder lets the encoded bytearray be resized."""
+        finder = LZ77Compressor.create_match_finder("rfind")
+        data = bytearray(b"The quick brown fox jumps over the lazy dog. " * 10)
+        tokens = LZ77Compressor.encode(data, match_finder=finder)
+        self.assertEqual(LZ77Compressor.decode(tokens), data)
+        data.extend(b"The lazy dog sleeps. " * 5)
+        tokens = LZ77Compressor.encode(data, match_finder=finder)
+        self.assertEqual(LZ77Compressor.decode(tokens), data)
+        data.extend(b"!")
+
+
+class TestOptimalParser(unittest.TestCase):
+    """Test the near-optimal parser."""
+
+    def test_parse_is_cheaper_than_greedy(self):
+        """Test that the optimal parse costs no more bits than the greedy one."""
+        data = b"abcde abcdX bcdeY abcdeY bcdX abcdeZ " * 20
+        parser = OptimalParser(BinaryTreeMatchFinder(window_size=2**9))
+        tokens = parser.parse(data)
+        self.assertEqual(LZ77Compressor.decode(tokens), data)
+
+        greedy = LZ77Compressor.encode(data, strategy="greedy")
+        self.assertLessEqual(
+            parser._parse_cost(tokens, parser._block_bit_lengths(tokens)),
+            parser._parse_cost(greedy, parser._block_bit_lengths(greedy)),
+        )
+
+    def test_parse_spans_blocks(self):
+        """Test that parsing block by block covers the whole input."""
+        data = b"0123456789" * 30
+        parser = OptimalParser(HashChainMatchFinder(window_size=2**9), block_size=64)
+        self.assertEqual(LZ77Compressor.decode(parser.parse(data)), data)
+
+
+class TestMatchStatistics(unittest.TestCase):
+    """Test cases for the match finder statistics."""
+
+    def test_statistics_do_not_change_tokens(self):
+        """Test that counting leaves the tokens unchanged and covers every byte."""
+        data = b"abcabcabcd" * 50 + bytes(range(256))
+        for strategy in LZ77Compressor.STRATEGIES:
+            for match_finder in ("hash_chain", "rfind"):
+                statistics = MatchStatistics()
+                tokens = LZ77Compressor.encode(
+                    data,
+                    match_finder=match_finder,
+                    strategy=strategy,
+                    statistics=statistics,
+                )
+                self.assertEqual(
+                    tokens,
+                    LZ77Compressor.encode(
+                        data, match_finder=match_finder, strategy=strategy
+                    ),
+                )
+                self.assertEqual(
+                    statistics.literals + statistics.matched_bytes, len(data)
+                )
+                self.assertEqual(
+                    statistics.matches, sum(1 for token in tokens if token[1] > 0)
+                )
+
+    def test_probe_counts(self):
+        """Test that the probes of every search add up to the total."""
+        statistics = MatchStatistics()
+        LZ77Compressor.encode(b"abracadabra" * 20, statistics=statistics)
+        self.assertGreater(statistics.positions_searched, 0)
+        self.assertEqual(statistics.chain_depths.total(), statistics.positions_searched)
+        self.assertEqual(
+            sum(depth * count for depth, count in statistics.chain_depths.items()),
+            statistics.candidates_probed,
+        )
+        self.assertLess(statistics.literal_ratio, 0.1)
+        self.assertEqual(statistics.distance_bits.total(), statistics.matches)
+
+
+class TestTokenArray(unittest.TestCase):
+    """Test the array-backed token container."""
+
+    def test_round_trip_tuples(self):
+        """Test that tokens, including a missing next character, come back as given."""
+        tokens = [(0, 0, 97), (1, 258, 0), (32768, 3, 255), (4, 10, None)]
+        array = TokenArray(tokens)
+        self.assertEqual(len(array), 4)
+        self.assertEqual(list(array), tokens)
+        self.assertEqual(array[-1], (4, 10, None))
+        self.assertEqual(array, tokens)
+
+    def test_slicing_returns_token_array(self):
+        """Test that slices are TokenArrays over the same tokens."""
+        data = b"abcabcabcXabcabc" * 10
+        tokens = LZ77Compressor.encode(data)
+        self.assertIsInstance(tokens, TokenArray)
+        head, tail = tokens[:5], tokens[5:]
+        self.assertIsInstance(head, TokenArray)
+        head.extend(tail)
+        self.assertEqual(head, tokens)
+        self.assertEqual(LZ77Compressor.decode(head), data)
+
+    def test_numpy_views(self):
+        """Test that the NumPy views share the token columns."""
+        pytest.importorskip("numpy")
+        array = TokenArray([(0, 0, 97), (3, 5, None)])
+        distances, lengths, next_characters = array.numpy_views()
+        self.assertEqual(distances.tolist(), [0, 3])
+        self.assertEqual(lengths.tolist(), [0, 5])
+        self.assertEqual(next_characters.tolist(), [97, TokenArray.NO_CHARACTER])
+
+
 class TestBlockSplitter(unittest.TestCase):
     """Test the Block Splitter algorithm."""
 
@@ -224,6 +872,100 @@ class TestDeflateCompressor(unittest.TestCase):
         # Check that compression actually happened
         self.assertLess(len(compressed) // 8, len(data))
 
+    def test_decompress_invalid_fixed_distance(self):
+        """Test that the fixed distance codes 30 and 31 are rejected."""
+        for distance_code in (29, 30, 31):
+            writer = BitWriter()
+            writer.write(0b01, 2)
+            for symbol in (ord("a"), 257):
+                writer.write(
+                    FIXED_LITERAL_LENGTH_CODES[symbol],
+                    FIXED_LITERAL_LENGTH_BIT_LENGTHS[symbol],
+                )
+            writer.write(distance_code, 5)
+            writer.write(0, DistanceAlphabet.LONG_DISTANCE_TABLE[distance_code][1])
+            writer.write(FIXED_LITERAL_LENGTH_CODES[256], 7)
+            reader = BitReader(writer.getvalue())
+            if distance_code == 29:
+                tokens = DeflateCompressor._decode_blocks(reader, TokenArray())
+                self.assertEqual(list(tokens)[-1], (24577, 3, None))
+            else:
+                with self.assertRaises(ValueError):
+                    DeflateCompressor._decode_blocks(reader, TokenArray())
+
+    def test_decompress_invalid_code_lengths(self):
+        """Test that dynamic blocks with impossible code lengths are rejected."""
+        over_subscribed = [1] * 3 + [0] * 283
+        too_long = [1, 40] + [0] * 284
+        for literal_length_bit_lengths in (over_subscribed, too_long):
+            writer = BitWriter()
+            writer.write(0b10, 2)
+            writer.write_bit_string(
+                IntegerCompressor.encode(literal_length_bit_lengths + [5] * 30)
+            )
+            writer.write(0, 64)
+            with self.assertRaises(ValueError):
+                DeflateCompressor.decompress(writer.getvalue())
+
+    def test_decompress_oversized_stored_block(self):
+        """Test that a stored block longer than the data is rejected up front."""
+        writer = BitWriter()
+        writer.write(0b00, 2)
+        # The stored length 2**33 as an IntegerCompressor number
+        writer.write((1 << 34) - 1, 34)
+        writer.write(0, 1)
+        writer.write(1 << 33, 34)
+        writer.write(0, 64)
+        with self.assertRaises(ValueError):
+            DeflateCompressor.decompress(writer.getvalue())
+
+    def test_decompress_truncated_data(self):
+        """Test that data cut short is rejected instead of decoded as zeros."""
+        data = b"The quick brown fox jumps over the lazy dog. " * 100
+        for level in (0, 1, 6):
+            compressed = DeflateCompressor.compress(data, level)
+            truncated = compressed[: len(compressed) // 2]
+            with self.assertRaises(ValueError):
+                DeflateCompressor.decompress(truncated)
+
+    def test_preset_dictionary(self):
+        """Test that a preset dictionary is matched against at every level."""
+        zdict = b'{"user": {"name": "", "email": "@example.com"}, "status": "active"}'
+        data = (
+            b'{"user": {"name": "ada", "email": "ada@example.com"}, "status": "active"}'
+        )
+        for level in DeflateCompressor.LEVELS:
+            compressed = DeflateCompressor.compress(data, level, zdict=zdict)
+            self.assertEqual(
+                DeflateCompressor.decompress(compressed, zdict=zdict), data
+            )
+            if level > 0:
+                self.assertLess(
+                    len(compressed), len(DeflateCompressor.compress(data, level))
+                )
+
+    def test_long_range_mode(self):
+        """Test that long distances are coded with the extended distance alphabet."""
+        self.assertEqual(
+            DistanceAlphabet.decode(*DistanceAlphabet.encode(2**26)), (2**26, b"")
+        )
+        blob = os.urandom(2000)
+        data = blob + b"\x00" * 40000 + blob
+        compressed = DeflateCompressor.compress(data, 1, long_window_size=2**16)
+        self.assertEqual(DeflateCompressor.decompress(compressed), data)
+        self.assertLess(
+            len(compressed), len(DeflateCompressor.compress(data, 1)) - 1000
+        )
+
+    def test_maximal_match_uses_length_code_285(self):
+        """Test that a 258 byte match is coded with its own length code."""
+        self.assertEqual(SymbolLengthAlphabet.encode(258), (285, b""))
+        self.assertEqual(SymbolLengthAlphabet.encode(257), (284, b"11110"))
+        data = b"\x00" * 10000
+        self.assertEqual(
+            DeflateCompressor.decompress(DeflateCompressor.compress(data)), data
+        )
+
 
 @pytest.mark.parametrize(
     "data,description",
@@ -242,6 +984,98 @@ def test_deflate_compressor_compress_decompress_round_trip(data, description):
     assert decompressed == data
 
 
+@pytest.mark.parametrize("level", range(10))
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"a",
+        b"abc" * 100,
+        b"The quick brown fox jumps over the lazy dog. " * 20,
+        bytes(range(256)) * 2,
+    ],
+)
+def test_deflate_compressor_levels_round_trip(data, level):
+    """Test compressing and decompressing round trip at every compression level."""
+    compressed = DeflateCompressor.compress(data, level=level)
+    assert DeflateCompressor.decompress(compressed) == data
+
+
+class TestReusableCompressor(unittest.TestCase):
+    """Test cases for the reusable Compressor and Decompressor."""
+
+    def test_reuse_matches_deflate_compressor(self):
+        """Test that every call gives the output of a fresh DeflateCompressor."""
+        messages = [
+            b"The quick brown fox jumps over the lazy dog. " * 50,
+            b"short",
+            b"",
+            b"The quick brown fox jumps over the lazy cat. " * 3,
+            os.urandom(500),
+        ]
+        for level in DeflateCompressor.LEVELS:
+            compressor = Compressor(level)
+            decompressor = Decompressor()
+            for data in messages:
+                compressed = compressor.compress(data)
+                self.assertEqual(compressed, DeflateCompressor.compress(data, level))
+                self.assertEqual(decompressor.decompress(compressed), data)
+
+    def test_preset_dictionary(self):
+        """Test that the dictionary is applied on every call."""
+        zdict = b'{"user": {"name": "", "email": "@example.com"}, "status": "active"}'
+        compressor = Compressor(zdict=zdict)
+        decompressor = Decompressor(zdict=zdict)
+        for name in (b"ada", b"grace", b"ada"):
+            data = b'{"user": {"name": "%s", "email": "%s@example.com"}}' % (name, name)
+            compressed = compressor.compress(data)
+            self.assertEqual(compressed, DeflateCompressor.compress(data, zdict=zdict))
+            self.assertEqual(decompressor.decompress(compressed), data)
+
+    def test_fast_table_reused(self):
+        """Test that the fast strategy's hash table is kept and reset between calls."""
+        zdict = b"The quick brown fox jumps over the lazy dog. "
+        messages = [zdict * 20, b"jumps over the lazy cat", zdict[::-1] * 5]
+        for dictionary in (None, zdict):
+            compressor = Compressor(1, zdict=dictionary)
+            table = compressor._parameters["fast_table"]
+            for data in messages:
+                self.assertEqual(
+                    compressor.compress(data),
+                    DeflateCompressor.compress(data, 1, zdict=dictionary),
+                )
+            self.assertIs(compressor._parameters["fast_table"], table)
+            self.assertEqual(len(table), 1 << LZ77Compressor.FAST_HASH_BITS)
+
+    def test_invalid_level(self):
+        """Test that the level is validated when the compressor is created."""
+        with pytest.raises(ValueError):
+            Compressor(10)
+
+
+class TestCompressionLevels(unittest.TestCase):
+    """Test the compression level presets."""
+
+    def test_invalid_level(self):
+        """Test that levels outside 0-9 are rejected."""
+        with self.assertRaises(ValueError):
+            DeflateCompressor.compress(b"abc", level=10)
+
+    def test_level_zero_stores_data(self):
+        """Test that level 0 stores the data without compressing it."""
+        data = b"abc" * 1000
+        compressed = DeflateCompressor.compress(data, level=0)
+        self.assertGreaterEqual(len(compressed), len(data))
+        self.assertEqual(DeflateCompressor.decompress(compressed), data)
+
+    def test_higher_level_compresses_better(self):
+        """Test that the best level compresses no worse than the fastest one."""
+        data = b"".join(b"line %d: value=%d\n" % (i, i * i % 97) for i in range(300))
+        fastest = DeflateCompressor.compress(data, level=1)
+        best = DeflateCompressor.compress(data, level=9)
+        self.assertLessEqual(len(best), len(fastest))
+
+
 class TestIntegration(unittest.TestCase):
     """Integration tests for the complete system."""
 